@@ -1,82 +1,118 @@
 """Application configuration loaded from environment variables."""
 
+import os
+from dataclasses import MISSING, dataclass, field, fields
+from functools import lru_cache
 from pathlib import Path
-from pydantic_settings import BaseSettings
-from pydantic import Field
 
 
-class Settings(BaseSettings):
-    """All configuration for the MCP GitHub Server."""
+@dataclass(slots=True, frozen=True)
+class Settings:
+    """All configuration for the MCP GitHub Server.
+
+    Each field is read from the upper-cased environment variable of the
+    same name (e.g. ``github_token`` <- ``GITHUB_TOKEN``).
+    """
 
     # --- GitHub ---
-    github_repo_url: str = Field(
-        ..., description="HTTPS clone URL for the target repository"
-    )
-    github_token: str = Field(
-        ..., description="GitHub Personal Access Token with repo scope"
-    )
-    github_branch: str = Field(
-        default="main", description="Branch to track"
-    )
+    github_repo_url: str  # HTTPS clone URL for the target repository
+    github_token: str  # GitHub Personal Access Token with repo scope
 
     # --- OAuth 2.1 ---
-    oauth_client_id: str = Field(
-        ..., description="OAuth client ID for Claude connector"
-    )
-    oauth_client_secret: str = Field(
-        ..., description="OAuth client secret for Claude connector"
-    )
-    oauth_issuer_url: str = Field(
-        ..., description="Public base URL of this server (JWT issuer)"
-    )
-    jwt_secret_key: str = Field(
-        ..., description="Secret key for signing JWT tokens"
-    )
+    oauth_client_id: str  # OAuth client ID for Claude connector
+    oauth_client_secret: str  # OAuth client secret for Claude connector
+    oauth_issuer_url: str  # Public base URL of this server (JWT issuer)
+    jwt_secret_key: str  # Secret key for signing JWT tokens
+
+    github_branch: str = "main"  # Branch to track
 
     # --- Server ---
-    host: str = Field(default="0.0.0.0")
-    port: int = Field(default=8000)
-    log_level: str = Field(default="INFO")
+    host: str = "0.0.0.0"
+    port: int = 8000
+    log_level: str = "INFO"
 
     # --- Storage ---
-    repo_dir: str = Field(
-        default="/data/repo",
-        description="Local path where the Git repo is cloned",
-    )
-    index_dir: str = Field(
-        default="/data/index",
-        description="Local path for FAISS index and metadata",
-    )
-
-    # --- Sync Timing ---
-    pull_interval: int = Field(
-        default=300, description="Seconds between periodic git pulls"
-    )
-    push_debounce: int = Field(
-        default=120, description="Seconds to wait after last write before pushing"
-    )
+    repo_dir: str = "/data/repo"  # Local path where the Git repo is cloned
+    index_dir: str = "/data/index"  # Local path for FAISS index and metadata
 
-    model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
+    # History depth for the initial clone (0 = full history). Shallow
+    # clones are deepened with a one-off unshallow fetch on first push.
+    clone_depth: int = 0
 
-    # --- Derived helpers ---
+    # --- Search ---
+    faiss_nprobe: int = 8  # IVF lists probed per query once the index is IVF-PQ
+    # Memory-map a saved flat index on startup instead of reading it into
+    # RAM; it is loaded for real on the first index update
+    faiss_mmap: bool = False
 
-    @property
-    def repo_path(self) -> Path:
-        return Path(self.repo_dir)
+    # --- Sync Timing ---
+    pull_interval: int = 300  # Seconds between periodic git pulls
+    push_debounce: int = 120  # Seconds to wait after last write before pushing
+    # Max seconds a pending write waits for a push, even if writes continue
+    push_max_wait: int = 600
 
-    @property
-    def index_path(self) -> Path:
-        return Path(self.index_dir)
+    # --- Derived helpers (computed once per instance) ---
+    repo_path: Path = field(init=False, repr=False, compare=False)
+    index_path: Path = field(init=False, repr=False, compare=False)
+    authenticated_repo_url: str = field(init=False, repr=False, compare=False)
 
-    @property
-    def authenticated_repo_url(self) -> str:
-        """Insert token into HTTPS URL for git clone/push."""
+    def __post_init__(self):
         url = self.github_repo_url
         if url.startswith("https://"):
-            return url.replace("https://", f"https://x-access-token:{self.github_token}@")
-        return url
+            # Insert token into HTTPS URL for git clone/push
+            url = url.replace("https://", f"https://x-access-token:{self.github_token}@")
+        object.__setattr__(self, "repo_path", Path(self.repo_dir))
+        object.__setattr__(self, "index_path", Path(self.index_dir))
+        object.__setattr__(self, "authenticated_repo_url", url)
+
+
+def _load_dotenv(path: Path) -> dict[str, str]:
+    """Parse a minimal ``KEY=value`` .env file (comments and quotes allowed)."""
+    values: dict[str, str] = {}
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, _, value = line.removeprefix("export ").partition("=")
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+            value = value[1:-1]
+        values[key.strip().upper()] = value
+    return values
+
+
+def load_settings(env_file: str | os.PathLike = ".env") -> Settings:
+    """Build Settings from the process environment, falling back to env_file.
+
+    Real environment variables take precedence over the .env file.
+    """
+    env_path = Path(env_file)
+    env = _load_dotenv(env_path) if env_path.is_file() else {}
+    env.update((k.upper(), v) for k, v in os.environ.items())
+
+    kwargs: dict = {}
+    missing: list[str] = []
+    for f in fields(Settings):
+        if not f.init:
+            continue
+        key = f.name.upper()
+        if key in env:
+            value = env[key]
+            if f.type is int:
+                value = int(value)
+            elif f.type is bool:
+                value = value.strip().lower() in ("1", "true", "yes", "on")
+            kwargs[f.name] = value
+        elif f.default is MISSING:
+            missing.append(key)
+    if missing:
+        raise RuntimeError(
+            f"Missing required environment variables: {', '.join(missing)}"
+        )
+    return Settings(**kwargs)
 
 
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
-    """Create and return a validated Settings instance."""
-    return Settings()
+    """Create, validate and cache the process-wide Settings instance."""
+    return load_settings()
@@ -1,7 +1,6 @@
 """Push Debouncer — batches write operations into single git pushes."""
 
 import asyncio
-from datetime import datetime, timezone
 from typing import Optional
 
 import structlog
@@ -17,14 +16,28 @@ class PushDebouncer:
     After the first write notification, waits `delay` seconds. If another
     write arrives during that window, the timer resets. When the timer
     finally fires, all accumulated changes are pushed in one commit.
+
+    The timer is never pushed back past `max_wait` seconds after the first
+    pending write, so a steady trickle of writes still gets committed
+    periodically instead of waiting for the writes to stop.
     """
 
-    def __init__(self, git_manager: GitSyncManager, delay: int = 120):
+    def __init__(
+        self,
+        git_manager: GitSyncManager,
+        delay: int = 120,
+        max_wait: Optional[int] = None,
+    ):
         self._git_manager = git_manager
         self._delay = delay
+        self._max_wait = max_wait if max_wait is not None else delay * 5
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         self._timer_handle: Optional[asyncio.TimerHandle] = None
-        self._pending_files: list[str] = []
-        self._first_write_time: Optional[datetime] = None
+        self._push_task: Optional[asyncio.Task] = None
+        # Insertion-ordered set: O(1) dedupe, stable order for the message
+        self._pending_files: dict[str, None] = {}
+        # Event-loop (monotonic) time of the first pending write; 0.0 = none
+        self._first_write_mono: float = 0.0
         self._lock = asyncio.Lock()
 
     @property
@@ -34,53 +47,80 @@ class PushDebouncer:
     async def notify_write(self, file_path: str = ""):
         """Called after any write operation. Resets the debounce timer."""
         async with self._lock:
-            if file_path and file_path not in self._pending_files:
-                self._pending_files.append(file_path)
+            if file_path:
+                self._pending_files[file_path] = None
+
+            if self._loop is None:
+                self._loop = asyncio.get_running_loop()
+            loop = self._loop
+
+            now = loop.time()
+            if self._first_write_mono == 0.0:
+                self._first_write_mono = now
+
+            # Debounce, but never beyond max_wait after the first write
+            age = now - self._first_write_mono
+            delay = max(0.0, min(self._delay, self._max_wait - age))
 
-            if self._first_write_time is None:
-                self._first_write_time = datetime.now(timezone.utc)
+            # Existing timer already fires within a second of the new
+            # deadline: re-arming it would gain nothing, so keep it.
+            if self._timer_handle is not None:
+                remaining = self._timer_handle.when() - now
+                if delay - 1 < remaining <= delay:
+                    return
 
             # Cancel existing timer
             if self._timer_handle is not None:
                 self._timer_handle.cancel()
 
             # Start new timer
-            loop = asyncio.get_event_loop()
-            self._timer_handle = loop.call_later(
-                self._delay, lambda: asyncio.ensure_future(self._do_push())
-            )
+            self._timer_handle = loop.call_later(delay, self._fire)
             log.debug(
                 "debounce_reset",
                 pending=len(self._pending_files),
-                delay=self._delay,
+                delay=delay,
             )
 
-    async def _do_push(self):
-        """Execute the debounced push."""
+    def _fire(self):
+        """Timer callback — start the push task."""
+        self._timer_handle = None
+        self._push_task = asyncio.create_task(self._do_push(scoped=True))
+
+    async def _do_push(self, scoped: bool = False):
+        """Execute the debounced push.
+
+        A scoped push only checks the notified paths for changes instead of
+        the whole working tree.
+        """
         async with self._lock:
             if not self._pending_files:
                 return
 
             file_count = len(self._pending_files)
-            files_summary = ", ".join(self._pending_files[:5])
+            files_summary = ", ".join(list(self._pending_files)[:5])
             if file_count > 5:
                 files_summary += f" (+{file_count - 5} more)"
 
             message = f"MCP: Update {file_count} file(s) — {files_summary}"
 
             log.info("debounce_push_start", files=file_count)
-            success = await self._git_manager.push(message)
+            paths = list(self._pending_files) if scoped else None
+            success = await self._git_manager.push(message, paths)
 
             if success:
                 self._pending_files.clear()
-                self._first_write_time = None
+                self._first_write_mono = 0.0
                 self._timer_handle = None
                 log.info("debounce_push_done", files=file_count)
             else:
+                # Restart the max_wait window, or every later write would
+                # retry at once while the remote stays unreachable
+                self._first_write_mono = self._loop.time()
                 log.error("debounce_push_failed", files=file_count)
 
     async def force_push(self):
         """Force an immediate push (used during shutdown)."""
         if self._timer_handle is not None:
             self._timer_handle.cancel()
+            self._timer_handle = None
         await self._do_push()
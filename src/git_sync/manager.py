@@ -1,11 +1,15 @@
 """Git Sync Manager — handles clone, pull, push, and change detection."""
 
 import asyncio
+import concurrent.futures
+import os
+import subprocess
+from collections.abc import Iterable
 from pathlib import Path
 from typing import Optional
 
+import pygit2
 import structlog
-from git import Repo, GitCommandError
 
 from src.config import Settings
 
@@ -17,18 +21,75 @@ CHANGE_MODIFIED = "M"
 CHANGE_DELETED = "D"
 CHANGE_RENAMED = "R"
 
+# Working-tree status flags whose paths must be (re-)added to the index
+_WT_STAGEABLE = (
+    pygit2.GIT_STATUS_WT_NEW
+    | pygit2.GIT_STATUS_WT_MODIFIED
+    | pygit2.GIT_STATUS_WT_TYPECHANGE
+    | pygit2.GIT_STATUS_WT_RENAMED
+)
+# Flags of paths with something to commit; status_file also reports
+# GIT_STATUS_IGNORED, which repo.status() leaves out
+_CHANGED = (
+    _WT_STAGEABLE
+    | pygit2.GIT_STATUS_WT_DELETED
+    | pygit2.GIT_STATUS_INDEX_NEW
+    | pygit2.GIT_STATUS_INDEX_MODIFIED
+    | pygit2.GIT_STATUS_INDEX_DELETED
+    | pygit2.GIT_STATUS_INDEX_RENAMED
+    | pygit2.GIT_STATUS_INDEX_TYPECHANGE
+)
+
+# Identity used for auto-commits when the clone has no user.name/user.email
+_FALLBACK_SIGNATURE = ("MCP Server", "mcp-server@localhost")
+
+
+_CONFLICT_KEYWORDS = ("conflict", "merge")
+
+
+def _is_conflict(e: subprocess.CalledProcessError) -> bool:
+    """True if a failed git command reported a merge/rebase conflict."""
+    msg = f"{e.stdout}{e.stderr}".lower()
+    return any(k in msg for k in _CONFLICT_KEYWORDS)
+
+
+class _RemoteCallbacks(pygit2.RemoteCallbacks):
+    """Supplies the GitHub token and surfaces rejected pushes as errors.
+
+    libgit2 reports per-ref push rejections through a callback instead of
+    failing the push call, so we raise here to keep push() honest.
+    """
+
+    def __init__(self, token: str):
+        super().__init__(
+            credentials=pygit2.UserPass("x-access-token", token)
+        )
+
+    def push_update_reference(self, refname: str, message: Optional[str]):
+        if message is not None:
+            raise pygit2.GitError(f"push rejected for {refname}: {message}")
+
 
 class GitSyncManager:
-    """Manages a local Git clone with periodic pull and debounced push."""
+    """Manages a local Git clone with periodic pull and debounced push.
+
+    All routine operations run in-process through libgit2 (pygit2); the
+    git CLI is only used to rebase local commits onto a diverged remote.
+    """
 
     def __init__(self, settings: Settings):
         self._settings = settings
-        self._repo: Optional[Repo] = None
-        self._repo_path = Path(settings.repo_dir)
+        self._repo: Optional[pygit2.Repository] = None
+        self._repo_path = settings.repo_path
         self._lock = asyncio.Lock()
+        # Git work is serialised by the lock anyway, so a single dedicated
+        # thread suffices and keeps it off the shared default executor.
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="git"
+        )
 
     @property
-    def repo(self) -> Repo:
+    def repo(self) -> pygit2.Repository:
         assert self._repo is not None, "GitSyncManager not initialised"
         return self._repo
 
@@ -36,35 +97,73 @@ class GitSyncManager:
     def repo_path(self) -> Path:
         return self._repo_path
 
+    async def _run(self, fn, *args):
+        """Run a blocking git operation on the dedicated git thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def close(self):
+        """Shut down the git worker thread (call on application shutdown)."""
+        self._executor.shutdown(wait=True)
+
+    def _callbacks(self) -> _RemoteCallbacks:
+        return _RemoteCallbacks(self._settings.github_token)
+
     # ------------------------------------------------------------------
     # Initialisation
     # ------------------------------------------------------------------
 
     async def init(self):
         """Clone the repository if it doesn't exist, otherwise open and pull."""
-        await asyncio.to_thread(self._init_sync)
+        await self._run(self._init_sync)
 
     def _init_sync(self):
         if (self._repo_path / ".git").exists():
             log.info("git_open_existing", path=str(self._repo_path))
-            self._repo = Repo(self._repo_path)
+            self._repo = pygit2.Repository(str(self._repo_path))
             self._configure_remote()
             self._pull_sync()
         else:
             log.info("git_cloning", url=self._settings.github_repo_url)
             self._repo_path.mkdir(parents=True, exist_ok=True)
-            self._repo = Repo.clone_from(
+            self._repo = pygit2.clone_repository(
                 self._settings.authenticated_repo_url,
                 str(self._repo_path),
+                remote=self._create_origin,
+                checkout_branch=self._settings.github_branch,
+                callbacks=self._callbacks(),
+                depth=self._settings.clone_depth,
+            )
+            config = self._repo.config
+            config["remote.origin.tagOpt"] = "--no-tags"
+            # Keep the rebase fallback from pausing for automatic gc
+            config["gc.auto"] = 0
+            log.info(
+                "git_cloned",
                 branch=self._settings.github_branch,
+                depth=self._settings.clone_depth or None,
             )
-            log.info("git_cloned", branch=self._settings.github_branch)
+
+    def _create_origin(
+        self, repo: pygit2.Repository, name: bytes, url: bytes
+    ) -> pygit2.Remote:
+        """Create origin tracking only the configured branch (--single-branch)."""
+        name, url = name.decode(), url.decode()
+        branch = self._settings.github_branch
+        return repo.remotes.create(
+            name, url, f"+refs/heads/{branch}:refs/remotes/{name}/{branch}"
+        )
 
     def _configure_remote(self):
-        """Ensure the origin remote uses the authenticated URL."""
-        origin = self._repo.remotes.origin
-        with origin.config_writer as cw:
-            cw.set("url", self._settings.authenticated_repo_url)
+        """Ensure the origin remote uses the authenticated URL.
+
+        Only rewrites .git/config when the URL actually differs, so warm
+        starts don't touch the file.
+        """
+        desired = self._settings.authenticated_repo_url
+        if self._repo.remotes["origin"].url == desired:
+            return
+        self._repo.remotes.set_url("origin", desired)
 
     # ------------------------------------------------------------------
     # Pull
@@ -76,49 +175,38 @@ class GitSyncManager:
         Returns list of (file_path, change_type) tuples for changed files.
         """
         async with self._lock:
-            return await asyncio.to_thread(self._pull_sync)
+            return await self._run(self._pull_sync)
 
     def _pull_sync(self) -> list[tuple[str, str]]:
         """Synchronous pull implementation."""
         try:
-            old_head = self._repo.head.commit.hexsha
+            old_head = self._repo.head.target
+            remote = self._repo.remotes["origin"]
 
-            # Fetch first to see if there are changes
-            self._repo.remotes.origin.fetch()
+            # Ask the remote for its branch tip (a single ref advertisement,
+            # no pack negotiation) and only fetch when it has moved.
+            if self._advertised_oid(remote) != self._remote_oid():
+                remote.fetch(callbacks=self._callbacks())
 
             # Check if remote has new commits
-            branch = self._settings.github_branch
-            remote_ref = f"origin/{branch}"
-
-            try:
-                remote_commit = self._repo.commit(remote_ref)
-            except Exception:
-                log.warning("git_remote_ref_not_found", ref=remote_ref)
+            remote_oid = self._remote_oid()
+            if remote_oid is None:
                 return []
 
-            if remote_commit.hexsha == old_head:
+            if remote_oid == old_head:
                 return []  # Nothing new
 
-            # Pull with rebase
-            try:
-                self._repo.git.pull("--rebase", "origin", branch)
-            except GitCommandError as e:
-                if "conflict" in str(e).lower() or "merge" in str(e).lower():
-                    log.error("git_pull_conflict", error=str(e))
-                    # Abort rebase to keep repo in clean state
-                    try:
-                        self._repo.git.rebase("--abort")
-                    except GitCommandError:
-                        pass
-                    return []
-                raise
-
-            new_head = self._repo.head.commit.hexsha
+            # Fast-forward in-process, or rebase local commits on top
+            if not self._integrate_remote(remote_oid):
+                log.error("git_pull_conflict")
+                return []
+
+            new_head = self._repo.head.target
             if new_head == old_head:
                 return []
 
             # Detect changed files
-            changes = self._get_changes(old_head, new_head)
+            changes = self._get_changes(str(old_head), str(new_head))
             log.info("git_pulled", changes=len(changes))
             return changes
 
@@ -126,49 +214,143 @@ class GitSyncManager:
             log.exception("git_pull_failed")
             return []
 
+    def _advertised_oid(self, remote: pygit2.Remote) -> Optional[pygit2.Oid]:
+        """Return the remote's current tip of the tracked branch (ls-remote)."""
+        branch_ref = f"refs/heads/{self._settings.github_branch}"
+        for head in remote.list_heads(callbacks=self._callbacks()):
+            if head.name == branch_ref:
+                return head.oid
+        return None
+
+    def _remote_oid(self) -> Optional[pygit2.Oid]:
+        """Return the commit id of origin/<branch>, or None if missing."""
+        remote_ref = f"refs/remotes/origin/{self._settings.github_branch}"
+        ref = self._repo.references.get(remote_ref)
+        if ref is None:
+            log.warning("git_remote_ref_not_found", ref=remote_ref)
+            return None
+        return ref.target
+
+    def _integrate_remote(self, remote_oid: pygit2.Oid) -> bool:
+        """Bring HEAD up to date with the fetched remote commit.
+
+        Fast-forwards are handled by libgit2. When local commits have
+        diverged from the remote, falls back to ``git rebase``.
+
+        Returns False if the rebase hit a conflict (and was aborted).
+        """
+        analysis, _ = self._repo.merge_analysis(remote_oid)
+
+        if analysis & pygit2.GIT_MERGE_ANALYSIS_UP_TO_DATE:
+            return True
+
+        if analysis & pygit2.GIT_MERGE_ANALYSIS_FASTFORWARD:
+            self._repo.checkout_tree(
+                self._repo.get(remote_oid), strategy=pygit2.GIT_CHECKOUT_SAFE
+            )
+            self._repo.head.set_target(remote_oid)
+            return True
+
+        branch = self._settings.github_branch
+        try:
+            self._git("rebase", f"origin/{branch}")
+        except subprocess.CalledProcessError as e:
+            if _is_conflict(e):
+                log.error("git_rebase_conflict", error=e.stderr.strip())
+                self._abort_rebase()
+                return False
+            raise
+        return True
+
+    def _abort_rebase(self):
+        """Abort an in-progress rebase to keep the repo in a clean state."""
+        try:
+            self._git("rebase", "--abort")
+        except subprocess.CalledProcessError:
+            pass
+
+    def _git(self, *args: str) -> str:
+        """Run a git CLI command in the clone (rebase fallback only)."""
+        signature = self._signature()
+        env = {
+            **os.environ,
+            "GIT_COMMITTER_NAME": signature.name,
+            "GIT_COMMITTER_EMAIL": signature.email,
+        }
+        result = subprocess.run(
+            ["git", *args],
+            cwd=str(self._repo_path),
+            capture_output=True,
+            text=True,
+            check=True,
+            env=env,
+        )
+        return result.stdout
+
+    def _signature(self) -> pygit2.Signature:
+        """Configured git identity, or a fixed fallback for auto-commits."""
+        try:
+            return self._repo.default_signature
+        except KeyError:
+            return pygit2.Signature(*_FALLBACK_SIGNATURE)
+
     # ------------------------------------------------------------------
     # Push
     # ------------------------------------------------------------------
 
-    async def push(self, message: str = "MCP server auto-commit") -> bool:
+    async def push(
+        self,
+        message: str = "MCP server auto-commit",
+        paths: Optional[Iterable[str]] = None,
+    ) -> bool:
         """Stage all changes, commit, pull --rebase, and push.
 
+        Args:
+            message: Commit message.
+            paths: Repo-relative files known to have changed. When given,
+                only those are checked instead of scanning the whole tree.
+
         Returns True on success, False on failure.
         """
         async with self._lock:
-            return await asyncio.to_thread(self._push_sync, message)
+            return await self._run(self._push_sync, message, paths)
 
-    def _push_sync(self, message: str) -> bool:
+    def _push_sync(
+        self, message: str, paths: Optional[Iterable[str]] = None
+    ) -> bool:
         """Synchronous push implementation."""
         try:
-            # Check for changes
-            if not self._repo.is_dirty(untracked_files=True):
+            # Check for changes (single working-tree scan, reused for staging)
+            status = self._status_of(paths) if paths else None
+            if status is None:
+                status = self._repo.status()
+            if not status:
                 log.info("git_push_skip_clean")
                 return True
 
-            # Stage everything
-            self._repo.git.add("-A")
-
-            # Commit
-            self._repo.git.commit("-m", message)
+            # Stage everything and commit
+            if self._commit_all(message, status) is None:
+                log.info("git_push_skip_clean")
+                return True
             log.info("git_committed", message=message)
 
+            # A shallow clone may lack the merge base needed to rebase, so
+            # fetch the full history once before the first push.
+            if self._repo.is_shallow:
+                self._git("fetch", "--unshallow", "origin")
+                log.info("git_unshallowed")
+
             # Pull rebase before push to avoid conflicts
-            branch = self._settings.github_branch
-            try:
-                self._repo.git.pull("--rebase", "origin", branch)
-            except GitCommandError as e:
-                if "conflict" in str(e).lower():
-                    log.error("git_push_conflict", error=str(e))
-                    try:
-                        self._repo.git.rebase("--abort")
-                    except GitCommandError:
-                        pass
-                    return False
-                raise
+            remote = self._repo.remotes["origin"]
+            remote.fetch(callbacks=self._callbacks())
+            remote_oid = self._remote_oid()
+            if remote_oid is not None and not self._integrate_remote(remote_oid):
+                log.error("git_push_conflict")
+                return False
 
             # Push
-            self._repo.git.push("origin", branch)
+            branch = self._settings.github_branch
+            remote.push([f"refs/heads/{branch}"], callbacks=self._callbacks())
             log.info("git_pushed", branch=branch)
             return True
 
@@ -176,6 +358,47 @@ class GitSyncManager:
             log.exception("git_push_failed")
             return False
 
+    def _status_of(self, paths: Iterable[str]) -> Optional[dict[str, int]]:
+        """Status of just the given files, like ``repo.status()`` restricted to them.
+
+        Returns None if any path can't be checked on its own (a directory,
+        or a path git doesn't know), so the caller scans the whole tree.
+        """
+        status = {}
+        for path in paths:
+            try:
+                flags = self._repo.status_file(path)
+            except (KeyError, ValueError, pygit2.GitError):
+                return None
+            if flags & _CHANGED:
+                status[path] = flags
+        return status
+
+    def _commit_all(
+        self, message: str, status: dict[str, int]
+    ) -> Optional[pygit2.Oid]:
+        """Equivalent of ``git add -A && git commit -m message``.
+
+        Stages exactly the paths reported by ``status`` rather than letting
+        ``add_all`` rescan the whole working tree. Returns None, without
+        committing, if the staged tree is the same as HEAD's.
+        """
+        index = self._repo.index
+        for path, flags in status.items():
+            if flags & pygit2.GIT_STATUS_WT_DELETED:
+                index.remove(path)
+            elif flags & _WT_STAGEABLE:
+                index.add(path)
+        index.write()
+        tree = index.write_tree()
+        head = self._repo.head.peel(pygit2.Commit)
+        if tree == head.tree_id:
+            return None
+        signature = self._signature()
+        return self._repo.create_commit(
+            "HEAD", signature, signature, message, tree, [head.id]
+        )
+
     # ------------------------------------------------------------------
     # Change detection
     # ------------------------------------------------------------------
@@ -184,29 +407,33 @@ class GitSyncManager:
         """Get list of (file_path, change_type) between two commits."""
         changes = []
         try:
-            diff_output = self._repo.git.diff(
-                "--name-status", old_sha, new_sha
-            )
-            for line in diff_output.strip().split("\n"):
-                if not line.strip():
-                    continue
-                parts = line.split("\t")
-                if len(parts) >= 2:
-                    change_type = parts[0][0]  # First char: A, M, D, R, etc.
-                    file_path = parts[-1]  # Last element is the file path
-                    changes.append((file_path, change_type))
+            old_tree = self._repo[old_sha].peel(pygit2.Tree)
+            new_tree = self._repo[new_sha].peel(pygit2.Tree)
+            # Same root tree (e.g. empty commits): nothing to diff. libgit2
+            # already skips subtrees whose ids match on both sides.
+            if old_tree.id == new_tree.id:
+                return changes
+            diff = old_tree.diff_to_tree(new_tree)
+            diff.find_similar()  # Report renames like git diff does
+            # Deltas only: no patch/hunk text is generated
+            for delta in diff.deltas:
+                changes.append((delta.new_file.path, delta.status_char()))
         except Exception:
             log.exception("git_diff_failed", old=old_sha, new=new_sha)
         return changes
 
     async def get_current_status(self) -> dict:
         """Return current repo status for diagnostics."""
-        return await asyncio.to_thread(self._status_sync)
+        return await self._run(self._status_sync)
 
     def _status_sync(self) -> dict:
+        status = self._repo.status()
+        untracked = sum(
+            1 for flags in status.values() if flags & pygit2.GIT_STATUS_WT_NEW
+        )
         return {
-            "branch": str(self._repo.active_branch),
-            "head": self._repo.head.commit.hexsha[:8],
-            "dirty": self._repo.is_dirty(untracked_files=True),
-            "untracked": len(self._repo.untracked_files),
+            "branch": self._repo.head.shorthand,
+            "head": str(self._repo.head.target)[:8],
+            "dirty": bool(status),
+            "untracked": untracked,
         }
@@ -15,64 +15,102 @@ Architecture:
 
 import asyncio
 import contextlib
+import logging
+import sys
+from typing import TYPE_CHECKING
 
+import orjson
 import structlog
 from starlette.applications import Starlette
 from starlette.requests import Request
 from starlette.responses import JSONResponse
 from starlette.routing import Mount, Route
 
-from mcp.server.fastmcp import FastMCP
-
-from src.config import get_settings
+from src.config import Settings, get_settings
 from src.git_sync.debouncer import PushDebouncer
 from src.git_sync.manager import GitSyncManager
 from src.oauth.middleware import OAuthMiddleware
 from src.oauth.provider import oauth_routes
-from src.semantic.engine import SemanticSearchEngine
+
+# Heavy imports (FastMCP, the semantic stack, tool modules) are deferred
+# to create_app() / lifespan so that importing this module stays cheap.
+if TYPE_CHECKING:
+    from mcp.server.fastmcp import FastMCP
+    from src.semantic.engine import SemanticSearchEngine
 
 # ---------------------------------------------------------------------------
 # Logging setup
 # ---------------------------------------------------------------------------
-structlog.configure(
-    processors=[
-        structlog.stdlib.add_log_level,
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.dev.ConsoleRenderer(),
-    ],
-    wrapper_class=structlog.stdlib.BoundLogger,
-    logger_factory=structlog.PrintLoggerFactory(),
-)
-log = structlog.get_logger()
+def configure_logging(level: str = "INFO") -> None:
+    """Configure structlog: JSON lines to stderr, or console output on a TTY.
+
+    Debug (and other below-threshold) calls are replaced with no-ops by the
+    filtering bound logger instead of being rendered and then discarded.
+    """
+    processors = [
+        structlog.processors.add_log_level,
+        structlog.processors.TimeStamper(fmt="iso", utc=True),
+    ]
+    if sys.stderr.isatty():
+        processors.append(structlog.dev.ConsoleRenderer())
+        logger_factory = structlog.WriteLoggerFactory(file=sys.stderr)
+    else:
+        # orjson.dumps returns bytes, so write straight to the binary stream
+        processors += [
+            structlog.processors.format_exc_info,
+            structlog.processors.JSONRenderer(serializer=orjson.dumps),
+        ]
+        logger_factory = structlog.BytesLoggerFactory(file=sys.stderr.buffer)
+
+    level_no = logging.getLevelNamesMapping().get(level.upper())
+    structlog.configure(
+        processors=processors,
+        wrapper_class=structlog.make_filtering_bound_logger(
+            logging.INFO if level_no is None else level_no
+        ),
+        logger_factory=logger_factory,
+    )
+    if level_no is None:
+        structlog.get_logger().warning("log_level_invalid", log_level=level, using="INFO")
 
-# ---------------------------------------------------------------------------
-# Load & validate configuration at import time
-# ---------------------------------------------------------------------------
-settings = get_settings()
+
+# Default until lifespan re-applies the configured LOG_LEVEL
+configure_logging()
+log = structlog.get_logger()
 
 # ---------------------------------------------------------------------------
 # Shared component singletons (populated during lifespan startup)
 # ---------------------------------------------------------------------------
+settings: Settings | None = None
 git_manager: GitSyncManager | None = None
 debouncer: PushDebouncer | None = None
-search_engine: SemanticSearchEngine | None = None
+search_engine: "SemanticSearchEngine | None" = None
+mcp_server: "FastMCP | None" = None
 _pull_task: asyncio.Task | None = None
 
 # ---------------------------------------------------------------------------
 # FastMCP server — all tools registered here
 # ---------------------------------------------------------------------------
-mcp_server = FastMCP(
-    "GitHub MCP Server",
-    stateless_http=True,
-    json_response=True,
-)
-
-# Register tools (imported after mcp_server is created)
-from src.tools.crud import register_crud_tools  # noqa: E402
-from src.tools.search import register_search_tool  # noqa: E402
-
-register_crud_tools(mcp_server)
-register_search_tool(mcp_server)
+def _build_mcp() -> "FastMCP":
+    """Create the FastMCP server and register all 15 tools."""
+    from mcp.server.fastmcp import FastMCP
+    from src.tools.crud import register_crud_tools
+    from src.tools.search import register_search_tool
+
+    server = FastMCP(
+        "GitHub MCP Server",
+        stateless_http=True,
+        json_response=True,
+    )
+    # Components are created during lifespan, after the tools are registered
+    register_crud_tools(
+        server,
+        get_repo_dir=lambda: settings.repo_path,
+        get_debouncer=lambda: debouncer,
+        get_search_engine=lambda: search_engine,
+    )
+    register_search_tool(server, get_search_engine=lambda: search_engine)
+    return server
 
 # ---------------------------------------------------------------------------
 # Background pull loop
@@ -83,11 +121,12 @@ async def _periodic_pull():
         await asyncio.sleep(settings.pull_interval)
         try:
             changed = await git_manager.pull()
+            if changed:
+                from src.tools.crud import invalidate_listing_cache
+                invalidate_listing_cache()
             if changed and search_engine is not None:
-                for file_path, change_type in changed:
-                    await search_engine.on_file_changed(file_path, change_type)
-                if changed:
-                    log.info("periodic_pull_indexed", files=len(changed))
+                await search_engine.on_files_changed(changed)
+                log.info("periodic_pull_indexed", files=len(changed))
         except Exception:
             log.exception("periodic_pull_error")
 
@@ -97,7 +136,12 @@ async def _periodic_pull():
 @contextlib.asynccontextmanager
 async def lifespan(app: Starlette):
     """Initialise all components on startup; clean up on shutdown."""
-    global git_manager, debouncer, search_engine, _pull_task
+    global settings, git_manager, debouncer, search_engine, _pull_task
+
+    # Configuration is loaded here rather than at import time so that
+    # importing this module (tests, tooling) doesn't parse env / .env.
+    settings = get_settings()
+    configure_logging(settings.log_level)
 
     log.info("startup_begin", repo=settings.github_repo_url)
 
@@ -106,10 +150,20 @@ async def lifespan(app: Starlette):
     await git_manager.init()
     log.info("git_sync_ready")
 
-    # 2 — Push debouncer (waits push_debounce seconds after last write)
-    debouncer = PushDebouncer(git_manager, settings.push_debounce)
+    # 2 — Push debouncer (waits push_debounce seconds after last write,
+    #     but at most push_max_wait seconds after the first pending write)
+    debouncer = PushDebouncer(
+        git_manager, settings.push_debounce, settings.push_max_wait
+    )
 
     # 3 — Semantic search engine (loads saved index or builds from scratch)
+    import faiss
+    from src.semantic.engine import SemanticSearchEngine
+
+    # SIMD level FAISS runs with (e.g. "AVX2", or "DD" plus the variants
+    # for wheels that dispatch at runtime); see FAISS_OPT_LEVEL
+    log.info("faiss_runtime", compile_options=faiss.get_compile_options())
+
     search_engine = SemanticSearchEngine(settings)
     await search_engine.init()
     log.info("search_engine_ready", vectors=search_engine._faiss.total_vectors)
@@ -142,8 +196,12 @@ async def lifespan(app: Starlette):
         log.info("shutdown_final_push")
         await debouncer.force_push()
 
-    # Persist semantic index
+    if git_manager:
+        git_manager.close()
+
+    # Apply queued index updates, then persist semantic index
     if search_engine:
+        await search_engine.close()
         search_engine.save()
         log.info("shutdown_index_saved")
 
@@ -170,20 +228,36 @@ async def health(request: Request) -> JSONResponse:
 # ---------------------------------------------------------------------------
 # Starlette application
 # ---------------------------------------------------------------------------
-app = Starlette(
-    routes=[
-        # Health check (public)
-        Route("/health", health, methods=["GET"]),
-        # OAuth 2.1 endpoints (public)
-        *oauth_routes(settings),
-        # MCP Streamable HTTP transport (protected by OAuthMiddleware)
-        Mount("/mcp", app=mcp_server.streamable_http_app()),
-    ],
-    lifespan=lifespan,
-)
+def create_app() -> Starlette:
+    """Build the root Starlette app (and the FastMCP server it mounts)."""
+    global mcp_server
+    mcp_server = _build_mcp()
+
+    app = Starlette(
+        routes=[
+            # Health check (public)
+            Route("/health", health, methods=["GET"]),
+            # OAuth 2.1 endpoints (public)
+            *oauth_routes(),
+            # MCP Streamable HTTP transport (protected by OAuthMiddleware)
+            Mount("/mcp", app=mcp_server.streamable_http_app()),
+        ],
+        lifespan=lifespan,
+    )
+
+    # Add OAuth middleware (validates Bearer tokens on /mcp/* paths).
+    # Settings are resolved when Starlette builds the middleware stack.
+    app.add_middleware(OAuthMiddleware)
+    return app
+
 
-# Add OAuth middleware (validates Bearer tokens on /mcp/* paths)
-app.add_middleware(OAuthMiddleware, settings=settings)
+def __getattr__(name: str):
+    """Build ``app`` on first access, e.g. by ``uvicorn src.main:app``."""
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ---------------------------------------------------------------------------
 # CLI / Docker entrypoint
@@ -191,6 +265,7 @@ app.add_middleware(OAuthMiddleware, settings=settings)
 if __name__ == "__main__":
     import uvicorn
 
+    settings = get_settings()
     uvicorn.run(
         "src.main:app",
         host=settings.host,
@@ -3,6 +3,10 @@
 Protects the /mcp endpoint. All other paths pass through without auth.
 Returns a standards-compliant 401 with WWW-Authenticate header when
 the token is missing or invalid.
+
+Implemented as a plain ASGI middleware rather than BaseHTTPMiddleware,
+so requests pass straight through without a per-request task group or
+Request object.
 """
 
 from __future__ import annotations
@@ -10,11 +14,10 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 import structlog
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import JSONResponse, Response
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-from src.oauth.tokens import TokenError
+from src.oauth.tokens import TokenError, TokenManager
 
 if TYPE_CHECKING:
     from src.config import Settings
@@ -22,75 +25,79 @@ if TYPE_CHECKING:
 log = structlog.get_logger()
 
 # Paths that do NOT require authentication
-PUBLIC_PATHS = {
+PUBLIC_PATHS = frozenset({
     "/health",
     "/.well-known/oauth-authorization-server",
     "/.well-known/oauth-protected-resource",
     "/authorize",
     "/token",
-}
+})
+
+_UNAUTHORIZED_BODY = {"error": "unauthorized"}
 
 
-class OAuthMiddleware(BaseHTTPMiddleware):
+class OAuthMiddleware:
     """Validates Bearer tokens on protected routes."""
 
-    def __init__(self, app, settings: "Settings"):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, settings: "Settings | None" = None):
+        self.app = app
+        if settings is None:
+            from src.config import get_settings
+            settings = get_settings()
         self._settings = settings
-        self._token_manager = None
+        self._token_manager = TokenManager(
+            secret_key=settings.jwt_secret_key,
+            issuer=settings.oauth_issuer_url,
+        )
 
-    def _get_token_manager(self):
-        if self._token_manager is None:
-            from src.oauth.tokens import TokenManager
-            self._token_manager = TokenManager(
-                secret_key=self._settings.jwt_secret_key,
-                issuer=self._settings.oauth_issuer_url,
-            )
-        return self._token_manager
+        # Static parts of the 401 response, built once
+        realm = settings.oauth_issuer_url.rstrip("/")
+        self._www_auth_prefix = (
+            f'Bearer realm="{realm}", error="invalid_token", error_description='
+        )
 
-    async def dispatch(self, request: Request, call_next) -> Response:
-        path = request.url.path
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        # Allow public paths and anything under /.well-known/
-        if path in PUBLIC_PATHS or path.startswith("/.well-known/"):
-            return await call_next(request)
+        path = scope["path"]
 
-        # Only enforce auth on /mcp routes
-        if not path.startswith("/mcp"):
-            return await call_next(request)
+        # Only enforce auth on /mcp routes. This single prefix test also
+        # lets through /health, /authorize, /token and /.well-known/*.
+        if not path.startswith("/mcp") or path in PUBLIC_PATHS:
+            await self.app(scope, receive, send)
+            return
 
         # Extract Bearer token
-        auth_header = request.headers.get("Authorization", "")
-        if not auth_header.startswith("Bearer "):
+        auth_header = b""
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                auth_header = value
+                break
+
+        if not auth_header.startswith(b"Bearer "):
             log.warning("oauth_missing_token", path=path)
-            return self._unauthorized("Bearer token required")
+            await self._unauthorized("Bearer token required")(scope, receive, send)
+            return
 
-        token = auth_header[len("Bearer "):]
+        token = auth_header[len(b"Bearer "):].decode("latin-1")
 
         # Verify token
-        tm = self._get_token_manager()
         try:
-            claims = tm.verify_access_token(token)
-            # Attach claims to request state for downstream use
-            request.state.oauth_claims = claims
-            return await call_next(request)
+            claims = self._token_manager.verify_access_token(token)
         except TokenError as e:
             log.warning("oauth_invalid_token", error=str(e), path=path)
-            return self._unauthorized(str(e))
+            await self._unauthorized(str(e))(scope, receive, send)
+            return
+
+        # Attach claims to request state for downstream use
+        scope.setdefault("state", {})["oauth_claims"] = claims
+        await self.app(scope, receive, send)
 
     def _unauthorized(self, detail: str) -> JSONResponse:
-        base = self._settings.oauth_issuer_url.rstrip("/")
         return JSONResponse(
-            {
-                "error": "unauthorized",
-                "error_description": detail,
-            },
+            {**_UNAUTHORIZED_BODY, "error_description": detail},
             status_code=401,
-            headers={
-                "WWW-Authenticate": (
-                    f'Bearer realm="{base}",'
-                    f' error="invalid_token",'
-                    f' error_description="{detail}"'
-                )
-            },
+            headers={"WWW-Authenticate": f'{self._www_auth_prefix}"{detail}"'},
         )
@@ -18,6 +18,8 @@ from __future__ import annotations
 
 import base64
 import hashlib
+import heapq
+import hmac
 import html
 import secrets
 import time
@@ -34,10 +36,64 @@ if TYPE_CHECKING:
 log = structlog.get_logger()
 
 # In-memory store for pending authorization codes
-# Structure: {code: {client_id, redirect_uri, code_challenge, expires_at}}
+# Structure: {code: {client_id, redirect_uri, code_challenge (bytes), expires_at}}
 _auth_codes: dict[str, dict] = {}
+# Min-heap of (expires_at, code) so cleanup only touches expired entries.
+# Codes redeemed early leave a stale entry that is dropped at expiry.
+_auth_code_heap: list[tuple[float, str]] = []
 AUTH_CODE_TTL = 600  # 10 minutes
 
+
+# Consent page, encoded once at import. Filled in with ``%`` formatting
+# (literal percent signs are doubled); every value must be HTML-escaped.
+_CONSENT_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <title>Authorize — GitHub MCP Server</title>
+  <style>
+    * { box-sizing: border-box; margin: 0; padding: 0; }
+    body { font-family: system-ui, sans-serif; background: #0f0f0f; color: #e8e8e8;
+           display: flex; align-items: center; justify-content: center; min-height: 100vh; }
+    .card { background: #1a1a1a; border: 1px solid #2d2d2d; border-radius: 12px;
+             padding: 2rem; max-width: 420px; width: 100%%; }
+    h1 { font-size: 1.25rem; font-weight: 600; margin-bottom: 0.5rem; }
+    p { color: #aaa; font-size: 0.9rem; margin-bottom: 1.5rem; }
+    .scope-box { background: #111; border: 1px solid #2d2d2d; border-radius: 8px;
+                 padding: 0.75rem 1rem; margin-bottom: 1.5rem; font-size: 0.85rem;
+                 color: #ccc; }
+    .scope-box strong { color: #fff; }
+    .actions { display: flex; gap: 0.75rem; }
+    button { flex: 1; padding: 0.65rem 1rem; border-radius: 8px; border: none;
+              font-size: 0.9rem; cursor: pointer; font-weight: 500; }
+    .btn-allow { background: #2563eb; color: #fff; }
+    .btn-allow:hover { background: #1d4ed8; }
+    .btn-deny { background: #2d2d2d; color: #ccc; }
+    .btn-deny:hover { background: #3d3d3d; }
+  </style>
+</head>
+<body>
+  <div class="card">
+    <h1>Authorization Request</h1>
+    <p><strong style="color:#fff">%(client_id)s</strong> is requesting access to your GitHub MCP Server.</p>
+    <div class="scope-box">
+      <strong>Requested scope:</strong> %(scope)s
+    </div>
+    <form method="POST" action="/authorize">
+      <input type="hidden" name="client_id" value="%(client_id)s">
+      <input type="hidden" name="redirect_uri" value="%(redirect_uri)s">
+      <input type="hidden" name="code_challenge" value="%(code_challenge)s">
+      <input type="hidden" name="state" value="%(state)s">
+      <div class="actions">
+        <button type="submit" name="decision" value="allow" class="btn-allow">Authorize</button>
+        <button type="submit" name="decision" value="deny" class="btn-deny">Deny</button>
+      </div>
+    </form>
+  </div>
+</body>
+</html>""".encode()
+
 _token_manager = None  # Initialised in build_oauth_routes()
 
 
@@ -53,19 +109,25 @@ def _get_token_manager(settings: "Settings"):
     return _token_manager
 
 
-def _verify_pkce(code_verifier: str, code_challenge: str) -> bool:
-    """Verify PKCE S256: SHA256(verifier) == base64url(challenge)."""
+def _verify_pkce(code_verifier: str, code_challenge: str | bytes) -> bool:
+    """Verify PKCE S256: base64url(SHA256(verifier)) == challenge.
+
+    Compares raw bytes in constant time; the auth code store keeps the
+    challenge pre-encoded so the token endpoint skips the encode.
+    """
+    if isinstance(code_challenge, str):
+        code_challenge = code_challenge.encode()
     digest = hashlib.sha256(code_verifier.encode("ascii")).digest()
-    computed = base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
-    return computed == code_challenge
+    expected = base64.urlsafe_b64encode(digest).rstrip(b"=")
+    return hmac.compare_digest(expected, code_challenge)
 
 
 def _clean_expired_codes():
     """Remove expired auth codes from the in-memory store."""
     now = time.time()
-    expired = [k for k, v in _auth_codes.items() if v["expires_at"] < now]
-    for k in expired:
-        del _auth_codes[k]
+    while _auth_code_heap and _auth_code_heap[0][0] < now:
+        _, code = heapq.heappop(_auth_code_heap)
+        _auth_codes.pop(code, None)
 
 
 # ---------------------------------------------------------------------------
@@ -139,58 +201,15 @@ async def _authorize_get(request: Request, settings: "Settings") -> Response:
             status_code=400,
         )
 
-    # Build a minimal consent HTML page
-    safe_client = html.escape(client_id)
-    safe_scope = html.escape(scope)
-
-    consent_html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-  <meta charset="UTF-8">
-  <meta name="viewport" content="width=device-width, initial-scale=1.0">
-  <title>Authorize — GitHub MCP Server</title>
-  <style>
-    * {{ box-sizing: border-box; margin: 0; padding: 0; }}
-    body {{ font-family: system-ui, sans-serif; background: #0f0f0f; color: #e8e8e8;
-           display: flex; align-items: center; justify-content: center; min-height: 100vh; }}
-    .card {{ background: #1a1a1a; border: 1px solid #2d2d2d; border-radius: 12px;
-             padding: 2rem; max-width: 420px; width: 100%; }}
-    h1 {{ font-size: 1.25rem; font-weight: 600; margin-bottom: 0.5rem; }}
-    p {{ color: #aaa; font-size: 0.9rem; margin-bottom: 1.5rem; }}
-    .scope-box {{ background: #111; border: 1px solid #2d2d2d; border-radius: 8px;
-                 padding: 0.75rem 1rem; margin-bottom: 1.5rem; font-size: 0.85rem;
-                 color: #ccc; }}
-    .scope-box strong {{ color: #fff; }}
-    .actions {{ display: flex; gap: 0.75rem; }}
-    button {{ flex: 1; padding: 0.65rem 1rem; border-radius: 8px; border: none;
-              font-size: 0.9rem; cursor: pointer; font-weight: 500; }}
-    .btn-allow {{ background: #2563eb; color: #fff; }}
-    .btn-allow:hover {{ background: #1d4ed8; }}
-    .btn-deny {{ background: #2d2d2d; color: #ccc; }}
-    .btn-deny:hover {{ background: #3d3d3d; }}
-  </style>
-</head>
-<body>
-  <div class="card">
-    <h1>Authorization Request</h1>
-    <p><strong style="color:#fff">{safe_client}</strong> is requesting access to your GitHub MCP Server.</p>
-    <div class="scope-box">
-      <strong>Requested scope:</strong> {safe_scope}
-    </div>
-    <form method="POST" action="/authorize">
-      <input type="hidden" name="client_id" value="{html.escape(client_id)}">
-      <input type="hidden" name="redirect_uri" value="{html.escape(redirect_uri)}">
-      <input type="hidden" name="code_challenge" value="{html.escape(code_challenge)}">
-      <input type="hidden" name="state" value="{html.escape(state)}">
-      <div class="actions">
-        <button type="submit" name="decision" value="allow" class="btn-allow">Authorize</button>
-        <button type="submit" name="decision" value="deny" class="btn-deny">Deny</button>
-      </div>
-    </form>
-  </div>
-</body>
-</html>"""
-    return HTMLResponse(consent_html)
+    # Fill the pre-encoded consent page with the escaped parameters
+    body = _CONSENT_TEMPLATE % {
+        b"client_id": html.escape(client_id).encode(),
+        b"scope": html.escape(scope).encode(),
+        b"redirect_uri": html.escape(redirect_uri).encode(),
+        b"code_challenge": html.escape(code_challenge).encode(),
+        b"state": html.escape(state).encode(),
+    }
+    return HTMLResponse(body)
 
 
 async def _authorize_post(request: Request, settings: "Settings") -> Response:
@@ -209,15 +228,25 @@ async def _authorize_post(request: Request, settings: "Settings") -> Response:
             status_code=303,
         )
 
+    # Only codes for the configured client are ever issued, so the token
+    # endpoint needs a single comparison against the stored client_id.
+    if client_id != settings.oauth_client_id:
+        return JSONResponse(
+            {"error": "unauthorized_client", "error_description": "Unknown client_id"},
+            status_code=401,
+        )
+
     # Generate authorization code
     _clean_expired_codes()
     code = secrets.token_urlsafe(32)
+    expires_at = time.time() + AUTH_CODE_TTL
     _auth_codes[code] = {
         "client_id": client_id,
         "redirect_uri": redirect_uri,
-        "code_challenge": code_challenge,
-        "expires_at": time.time() + AUTH_CODE_TTL,
+        "code_challenge": code_challenge.encode(),
+        "expires_at": expires_at,
     }
+    heapq.heappush(_auth_code_heap, (expires_at, code))
 
     sep = "&" if "?" in redirect_uri else "?"
     redirect_url = f"{redirect_uri}{sep}code={code}"
@@ -276,8 +305,8 @@ async def _token_auth_code(form, settings: "Settings", tm) -> JSONResponse:
             status_code=400,
         )
 
-    # Verify client
-    if code_data["client_id"] != client_id or client_id != settings.oauth_client_id:
+    # Verify client (the stored client_id was validated at issue time)
+    if client_id != code_data["client_id"]:
         return JSONResponse(
             {"error": "invalid_client"},
             status_code=401,
@@ -341,8 +370,11 @@ async def _token_refresh(form, settings: "Settings", tm) -> JSONResponse:
 # Route builder
 # ---------------------------------------------------------------------------
 
-def oauth_routes(settings: "Settings") -> list[Route]:
-    """Return list of Starlette routes for OAuth endpoints."""
+def oauth_routes() -> list[Route]:
+    """Return list of Starlette routes for OAuth endpoints.
+
+    Handlers read configuration from ``request.app.state.settings``.
+    """
     return [
         Route(
             "/.well-known/oauth-authorization-server",
@@ -3,6 +3,8 @@
 from __future__ import annotations
 
 import secrets
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 
@@ -15,6 +17,25 @@ ACCESS_TOKEN_TTL = 3600        # 1 hour
 REFRESH_TOKEN_TTL = 86400 * 30  # 30 days
 ALGORITHM = "HS256"
 
+# Verified access tokens kept in memory so repeat requests skip HMAC + JSON
+VERIFIED_CACHE_SIZE = 1024
+# Cached tokens are re-verified this many seconds before they expire
+EXPIRY_LEEWAY = 5
+# Upper bound on outstanding refresh tokens (oldest are evicted first)
+MAX_REFRESH_TOKENS = 10_000
+
+
+def _copy_claims(payload: dict) -> dict:
+    """Copy of a cached payload that a caller can modify safely.
+
+    Claims are scalars apart from the scopes list, so a shallow copy plus a
+    fresh list is enough (and far cheaper than deepcopy on a cache hit).
+    """
+    claims = dict(payload)
+    if "scopes" in claims:
+        claims["scopes"] = list(claims["scopes"])
+    return claims
+
 
 class TokenError(Exception):
     """Raised when a token cannot be validated."""
@@ -27,8 +48,15 @@ class TokenManager:
     def __init__(self, secret_key: str, issuer: str):
         self._secret = secret_key
         self._issuer = issuer
-        # In-memory refresh token store: {token: {client_id, expires_at}}
-        self._refresh_tokens: dict[str, dict] = {}
+        self._jwt = jwt.PyJWT()
+        self._algorithms = (ALGORITHM,)
+        self._decode_options = {"require": ["exp", "iss", "aud"]}
+        # LRU of raw token -> verified payload
+        self._verified: OrderedDict[str, dict] = OrderedDict()
+        # In-memory refresh token store: {token: {client_id, expires_at}},
+        # expires_at in epoch seconds. The TTL is fixed, so insertion order
+        # is also expiry order and the front is always the next to expire.
+        self._refresh_tokens: OrderedDict[str, dict] = OrderedDict()
 
     # ------------------------------------------------------------------
     # Access tokens
@@ -62,24 +90,36 @@ class TokenManager:
     def verify_access_token(self, token: str) -> dict:
         """Verify a JWT access token.
 
+        Safe to call directly from async code: a cache hit is a dict lookup
+        and a full HS256 verify takes microseconds, so offloading it to a
+        thread would cost more than it saves.
+
         Args:
             token: JWT string from Authorization header.
 
         Returns:
-            Decoded payload dict on success.
+            Decoded payload dict on success (a copy the caller may modify;
+            the cache keeps its own).
 
         Raises:
             TokenError: If the token is invalid, expired, or malformed.
         """
+        payload = self._verified.get(token)
+        if payload is not None:
+            if payload["exp"] > time.time() + EXPIRY_LEEWAY:
+                self._verified.move_to_end(token)
+                return _copy_claims(payload)
+            del self._verified[token]  # Let the full decode report expiry
+
         try:
-            payload = jwt.decode(
+            payload = self._jwt.decode(
                 token,
                 self._secret,
-                algorithms=[ALGORITHM],
+                algorithms=self._algorithms,
                 audience=self._issuer,
                 issuer=self._issuer,
+                options=self._decode_options,
             )
-            return payload
         except jwt.ExpiredSignatureError:
             raise TokenError("Token has expired")
         except jwt.InvalidAudienceError:
@@ -88,6 +128,13 @@ class TokenManager:
             raise TokenError("Invalid token issuer")
         except jwt.DecodeError as e:
             raise TokenError(f"Token decode error: {e}")
+        except jwt.InvalidTokenError as e:
+            raise TokenError(f"Invalid token: {e}")
+
+        self._verified[token] = payload
+        if len(self._verified) > VERIFIED_CACHE_SIZE:
+            self._verified.popitem(last=False)
+        return _copy_claims(payload)
 
     # ------------------------------------------------------------------
     # Refresh tokens
@@ -102,12 +149,15 @@ class TokenManager:
         Returns:
             Random 64-char hex token string.
         """
+        self._reap_refresh_tokens()
         token = secrets.token_hex(32)
-        expires_at = datetime.now(timezone.utc) + timedelta(seconds=REFRESH_TOKEN_TTL)
+        expires_at = time.time() + REFRESH_TOKEN_TTL
         self._refresh_tokens[token] = {
             "client_id": client_id,
-            "expires_at": expires_at.isoformat(),
+            "expires_at": expires_at,
         }
+        while len(self._refresh_tokens) > MAX_REFRESH_TOKENS:
+            self._refresh_tokens.popitem(last=False)
         return token
 
     def use_refresh_token(self, token: str) -> Optional[str]:
@@ -119,15 +169,20 @@ class TokenManager:
         Returns:
             client_id if valid, None if invalid or expired.
         """
-        entry = self._refresh_tokens.get(token)
+        # Rotate: the token is consumed whether or not it is still valid;
+        # the caller creates a new one.
+        entry = self._refresh_tokens.pop(token, None)
         if not entry:
             return None
 
-        expires_at = datetime.fromisoformat(entry["expires_at"])
-        if datetime.now(timezone.utc) > expires_at:
-            del self._refresh_tokens[token]
+        if time.time() > entry["expires_at"]:
             return None
 
-        # Rotate: delete old, caller will create new
-        del self._refresh_tokens[token]
         return entry["client_id"]
+
+    def _reap_refresh_tokens(self):
+        """Drop expired refresh tokens from the front of the store."""
+        now = time.time()
+        tokens = self._refresh_tokens
+        while tokens and next(iter(tokens.values()))["expires_at"] < now:
+            tokens.popitem(last=False)
@@ -3,7 +3,11 @@
 from __future__ import annotations
 
 import hashlib
-from dataclasses import dataclass, field
+import os
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
@@ -12,7 +16,7 @@ import structlog
 log = structlog.get_logger()
 
 # Text file extensions we will index
-INDEXABLE_EXTENSIONS = {
+INDEXABLE_EXTENSIONS = frozenset({
     ".txt", ".md", ".markdown", ".py", ".js", ".ts", ".jsx", ".tsx",
     ".html", ".htm", ".css", ".scss", ".json", ".yaml", ".yml",
     ".toml", ".ini", ".cfg", ".conf", ".sh", ".bash", ".zsh",
@@ -20,13 +24,19 @@ INDEXABLE_EXTENSIONS = {
     ".c", ".cpp", ".h", ".hpp", ".cs", ".rb", ".php", ".r",
     ".sql", ".graphql", ".proto", ".xml", ".rst", ".tex",
     ".dockerfile", ".makefile", ".gitignore", ".env.example",
-}
+})
+
+# Extensionless files with known names
+INDEXABLE_NAMES = frozenset({
+    "makefile", "dockerfile", "rakefile", "gemfile",
+    "procfile", ".gitignore", ".env.example",
+})
 
 # Max file size to index (5 MB)
 MAX_FILE_SIZE = 5 * 1024 * 1024
 
 
-@dataclass
+@dataclass(slots=True)
 class Chunk:
     """A chunk of text from a file, with position tracking."""
     id: int                # Stable int64 ID for FAISS (derived from path + offset)
@@ -46,16 +56,80 @@ class Chunk:
         return self.text[:200].replace("\n", " ").strip()
 
 
+# Mask keeping chunk IDs positive int64 for FAISS
+_ID_MASK = 0x7FFFFFFFFFFFFFFF
+
+
+def _chunk_id(path_prefix: bytes, char_start: int) -> int:
+    """Chunk ID from a pre-encoded ``b"<file_path>:"`` prefix + offset."""
+    key = path_prefix + str(char_start).encode()
+    digest = hashlib.blake2b(key, digest_size=8).digest()
+    return int.from_bytes(digest, "big") & _ID_MASK
+
+
 def make_chunk_id(file_path: str, char_start: int) -> int:
     """Generate a stable int64 ID from file path + char offset.
 
-    Uses SHA-256 truncated to 63 bits (positive int64 for FAISS).
+    Uses an 8-byte BLAKE2b digest masked to 63 bits (positive int64 for
+    FAISS); much cheaper than SHA-256 for these short keys.
+    """
+    return _chunk_id(f"{file_path}:".encode(), char_start)
+
+
+def decode_text(data: bytes) -> str:
+    """Decode file bytes for chunking (UTF-8, undecodable bytes dropped).
+
+    Pure-ASCII content (the common case for source and notes) takes the
+    cheaper ASCII decode; the result is identical either way, so chunk
+    offsets stay consistent wherever files are decoded. Line endings are
+    translated to "\\n" as text-mode reads do, so offsets count "\\r\\n"
+    as one character, as in existing indexes and read_range.
+    """
+    if data.isascii():
+        text = data.decode("ascii")
+    else:
+        text = data.decode("utf-8", errors="ignore")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def _ext(name: str) -> str:
+    """Lower-cased extension of a bare file name, like ``Path.suffix``.
+
+    A leading dot is not an extension: ``.env`` has none (and so is not
+    indexed), matching the previous Path-based check.
+    """
+    i = name.rfind(".")
+    return name[i:].lower() if i > 0 else ""
+
+
+def _is_indexable_name(name: str) -> bool:
+    """Extension / well-known-name check on a bare file name."""
+    return _ext(name) in INDEXABLE_EXTENSIONS or name.lower() in INDEXABLE_NAMES
+
+
+def _walk_files(root: str, rel_dir: str = "") -> Iterator[tuple[str, os.DirEntry]]:
+    """Yield (relative_path, entry) for files under root, streaming.
+
+    Anything named ``.git*`` (the .git dir, .github, .gitignore, ...) is
+    skipped without descending into it. Symlinked directories are not
+    followed. Entries are sorted with directories keyed as "name/", so
+    files come out in sorted full-path order, as a sorted rglob gives.
     """
-    key = f"{file_path}:{char_start}"
-    digest = hashlib.sha256(key.encode()).digest()
-    # Take first 8 bytes, mask to positive int64
-    raw = int.from_bytes(digest[:8], "big")
-    return raw & 0x7FFFFFFFFFFFFFFF  # Ensure positive
+    with os.scandir(root) as it:
+        entries = sorted(
+            it,
+            key=lambda e: e.name + "/" if e.is_dir(follow_symlinks=False) else e.name,
+        )
+    for entry in entries:
+        if entry.name.startswith(".git"):
+            continue
+        rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+        if entry.is_dir(follow_symlinks=False):
+            yield from _walk_files(entry.path, rel_path)
+        elif entry.is_file():
+            yield rel_path, entry
 
 
 class FileChunker:
@@ -67,15 +141,7 @@ class FileChunker:
 
     def is_indexable(self, path: Path | str) -> bool:
         """Return True if the file should be semantically indexed."""
-        p = Path(path)
-        # Check extension
-        if p.suffix.lower() in INDEXABLE_EXTENSIONS:
-            return True
-        # Extensionless files with known names
-        if p.name.lower() in {"makefile", "dockerfile", "rakefile", "gemfile",
-                               "procfile", ".gitignore", ".env.example"}:
-            return True
-        return False
+        return _is_indexable_name(os.path.basename(path))
 
     def chunk_file(self, file_path: str, content: str) -> list[Chunk]:
         """Split file content into overlapping chunks.
@@ -89,7 +155,9 @@ class FileChunker:
         """
         chunks: list[Chunk] = []
 
-        if not content.strip():
+        # isspace() stops at the first non-blank character; strip() would
+        # copy the whole file first
+        if not content or content.isspace():
             return chunks
 
         step = self.chunk_size - self.overlap
@@ -98,27 +166,33 @@ class FileChunker:
 
         pos = 0
         total = len(content)
+        # Encode the path once; each chunk only appends its offset
+        path_prefix = f"{file_path}:".encode()
+
+        half = self.chunk_size // 2
 
         while pos < total:
             end = min(pos + self.chunk_size, total)
-            chunk_text = content[pos:end]
 
-            # Try to break at a newline or space for cleaner chunks
+            # Try to break at a newline for cleaner chunks: search only the
+            # back half of the window, in place, without slicing it first
             if end < total:
-                # Look back up to 50 chars for a newline
-                nl = chunk_text.rfind("\n")
-                if nl > self.chunk_size // 2:
-                    end = pos + nl + 1
-                    chunk_text = content[pos:end]
-
-            chunk = Chunk(
-                id=make_chunk_id(file_path, pos),
-                file_path=file_path,
-                char_start=pos,
-                char_end=end,
-                text=chunk_text,
-            )
-            chunks.append(chunk)
+                nl = content.rfind("\n", pos + half + 1, end)
+                if nl != -1:
+                    end = nl + 1
+
+            chunk_text = content[pos:end]
+
+            # Blank stretches (padding, long runs of empty lines) have
+            # nothing to embed
+            if not chunk_text.isspace():
+                chunks.append(Chunk(
+                    id=_chunk_id(path_prefix, pos),
+                    file_path=file_path,
+                    char_start=pos,
+                    char_end=end,
+                    text=chunk_text,
+                ))
             pos = max(pos + step, end - self.overlap)
 
             # Avoid infinite loop on very short content
@@ -128,45 +202,86 @@ class FileChunker:
         return chunks
 
     def chunk_directory(
-        self, repo_path: Path, skip_extensions: Optional[set[str]] = None
+        self,
+        repo_path: Path,
+        skip_extensions: Optional[set[str]] = None,
+        max_workers: Optional[int] = None,
     ) -> list[Chunk]:
         """Walk a directory and chunk all indexable files.
 
         Args:
             repo_path: Path to the repository root.
             skip_extensions: Optional set of extensions to skip.
+            max_workers: Thread pool size (default: CPU count, max 8).
 
         Returns:
             All chunks from all indexable files.
         """
         all_chunks: list[Chunk] = []
-        skip = skip_extensions or set()
-
-        for file_path in sorted(repo_path.rglob("*")):
-            # Skip .git and hidden dirs
-            if any(part.startswith(".git") for part in file_path.parts):
-                continue
-
-            if not file_path.is_file():
-                continue
-
-            if file_path.suffix.lower() in skip:
-                continue
-
-            if not self.is_indexable(file_path):
-                continue
+        files_chunked = 0
+        for chunks in self.iter_directory(repo_path, skip_extensions, max_workers):
+            all_chunks.extend(chunks)
+            files_chunked += 1
+
+        log.info(
+            "chunker_directory_done",
+            files_chunked=files_chunked,
+            chunks=len(all_chunks),
+        )
+        return all_chunks
 
-            if file_path.stat().st_size > MAX_FILE_SIZE:
-                log.debug("chunker_skip_large", path=str(file_path))
-                continue
+    def iter_directory(
+        self,
+        repo_path: Path,
+        skip_extensions: Optional[set[str]] = None,
+        max_workers: Optional[int] = None,
+    ) -> Iterator[list[Chunk]]:
+        """Yield the chunks of each indexable file under a directory.
 
-            try:
-                content = file_path.read_text(encoding="utf-8", errors="ignore")
-                rel_path = str(file_path.relative_to(repo_path))
-                chunks = self.chunk_file(rel_path, content)
-                all_chunks.extend(chunks)
-            except Exception:
-                log.exception("chunker_file_error", path=str(file_path))
+        The scandir walk feeds a thread pool as it goes, so files are read
+        and chunked while the walk continues; file reads and decoding
+        release the GIL, so disk latency overlaps across files. Results
+        come back per file, in walk order, and only a few files per
+        worker are read ahead of the consumer.
 
-        log.info("chunker_directory_done", files_chunked=len(all_chunks))
-        return all_chunks
+        Args:
+            repo_path: Path to the repository root.
+            skip_extensions: Optional set of extensions to skip.
+            max_workers: Thread pool size (default: CPU count, max 8).
+        """
+        skip = skip_extensions or set()
+        candidates = (
+            (rel_path, entry)
+            for rel_path, entry in _walk_files(str(repo_path))
+            if _ext(entry.name) not in skip
+            and _is_indexable_name(entry.name)
+        )
+
+        workers = max_workers or min(8, os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Bound the files in flight so a slow consumer throttles reads
+            in_flight: deque[Future[list[Chunk]]] = deque()
+            for rel_path, entry in candidates:
+                in_flight.append(pool.submit(self._chunk_entry, rel_path, entry))
+                if len(in_flight) >= workers * 4:
+                    chunks = in_flight.popleft().result()
+                    if chunks:
+                        yield chunks
+            while in_flight:
+                chunks = in_flight.popleft().result()
+                if chunks:
+                    yield chunks
+
+    def _chunk_entry(self, rel_path: str, entry: os.DirEntry) -> list[Chunk]:
+        """Read and chunk one file found by iter_directory."""
+        try:
+            if entry.stat().st_size > MAX_FILE_SIZE:
+                log.debug("chunker_skip_large", path=entry.path)
+                return []
+
+            with open(entry.path, "rb") as f:
+                content = decode_text(f.read())
+            return self.chunk_file(rel_path, content)
+        except Exception:
+            log.exception("chunker_file_error", path=entry.path)
+            return []
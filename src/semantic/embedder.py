@@ -7,7 +7,10 @@ Models are lazy-loaded on first use to allow fast startup.
 from __future__ import annotations
 
 import asyncio
-from typing import Optional
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 
 import numpy as np
 import structlog
@@ -21,62 +24,126 @@ EMBEDDING_DIM = 768
 PREFIX_DOCUMENT = "search_document: "
 PREFIX_QUERY = "search_query: "
 
+# Document embeddings kept in memory, keyed by a hash of the chunk text
+# (768 float32 = 3 KB each, so ~60 MB at the cap)
+EMBEDDING_CACHE_SIZE = 20_000
+
+# Recent query embeddings, keyed by the normalised query string
+QUERY_CACHE_SIZE = 512
+QUERY_CACHE_TTL = 300  # seconds
+
 
 class NomicEmbedder:
     """Wraps nomic-embed-text-v1.5 for document and query embedding.
 
-    Thread-safe: uses an asyncio lock to prevent concurrent model loading.
+    Thread-safe: a double-checked threading lock ensures the model is
+    loaded once, whether requested from coroutines or worker threads.
     """
 
     def __init__(self):
         self._model = None
-        self._lock = asyncio.Lock()
+        # Thread lock, taken inside the loader thread: coalesces concurrent
+        # coroutines and worker threads into a single model load.
+        self._lock = threading.Lock()
+        # LRU of blake2b(text) -> normalised float32 vector
+        self._cache: OrderedDict[bytes, np.ndarray] = OrderedDict()
+        # LRU of normalised query -> (monotonic expiry, vector)
+        self._query_cache: OrderedDict[str, tuple[float, np.ndarray]] = OrderedDict()
 
     async def _ensure_loaded(self):
         """Lazy-load the model on first call."""
-        if self._model is not None:
-            return
-        async with self._lock:
+        if self._model is None:
+            await asyncio.to_thread(self._load_once)
+
+    def _load_once(self):
+        with self._lock:
             if self._model is not None:
                 return
             log.info("embedder_loading_model", model=MODEL_NAME)
-            self._model = await asyncio.to_thread(self._load_model)
+            self._model = self._load_model()
             log.info("embedder_model_ready", model=MODEL_NAME)
 
     @staticmethod
     def _load_model():
+        import torch
         from sentence_transformers import SentenceTransformer
-        return SentenceTransformer(MODEL_NAME, trust_remote_code=True)
 
-    async def embed_documents(self, texts: list[str], batch_size: int = 32) -> np.ndarray:
+        model = SentenceTransformer(MODEL_NAME, trust_remote_code=True)
+        if torch.cuda.is_available():
+            # Half precision on GPU: halves memory traffic, uses tensor
+            # cores. Outputs are cast back to float32 after encoding.
+            model.half()
+            log.info("embedder_fp16", device=str(model.device))
+        return model
+
+    def _encode(self, texts: list[str], **kwargs) -> np.ndarray:
+        """Run the model without autograd bookkeeping (worker thread)."""
+        import torch
+
+        with torch.inference_mode():
+            return self._model.encode(
+                texts,
+                convert_to_numpy=True,
+                normalize_embeddings=True,  # L2 normalise for cosine via IP
+                show_progress_bar=False,
+                **kwargs,
+            )
+
+    async def embed_documents(
+        self,
+        texts: list[str],
+        batch_size: int = 32,
+        dtype: np.dtype = np.float32,
+    ) -> np.ndarray:
         """Embed a list of document texts.
 
         Applies 'search_document:' prefix and L2-normalises output
-        so inner product = cosine similarity.
+        so inner product = cosine similarity. Texts embedded before are
+        served from an in-memory cache; only the rest reach the model.
 
         Args:
             texts: List of text strings to embed.
             batch_size: Batch size for encoding.
+            dtype: Output dtype, e.g. np.float16 for compact storage.
+                Cached vectors are always kept as float32.
 
         Returns:
-            Float32 numpy array of shape (len(texts), 768).
+            Numpy array of shape (len(texts), 768) in ``dtype``.
         """
-        await self._ensure_loaded()
-        prefixed = [PREFIX_DOCUMENT + t for t in texts]
-        vectors = await asyncio.to_thread(
-            self._model.encode,
-            prefixed,
-            batch_size=batch_size,
-            convert_to_numpy=True,
-            normalize_embeddings=True,  # L2 normalise for cosine via IP
-            show_progress_bar=False,
-        )
-        return vectors.astype(np.float32)
+        keys = [
+            hashlib.blake2b(t.encode(), digest_size=16).digest() for t in texts
+        ]
+        out = np.empty((len(texts), EMBEDDING_DIM), dtype=np.float32)
+        misses: dict[bytes, list[int]] = {}
+        for i, key in enumerate(keys):
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                out[i] = cached
+            else:
+                misses.setdefault(key, []).append(i)
+
+        if misses:
+            await self._ensure_loaded()
+            prefixed = [PREFIX_DOCUMENT + texts[idx[0]] for idx in misses.values()]
+            vectors = await asyncio.to_thread(
+                self._encode, prefixed, batch_size=batch_size
+            )
+            for (key, idx), vector in zip(misses.items(), vectors):
+                out[idx] = vector
+                # Copy so the cache doesn't pin the whole batch array
+                self._cache[key] = out[idx[0]].copy()
+            while len(self._cache) > EMBEDDING_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+        return out.astype(dtype, copy=False)
 
     async def embed_query(self, query: str) -> np.ndarray:
         """Embed a single search query.
 
-        Applies 'search_query:' prefix and L2-normalises output.
+        Applies 'search_query:' prefix and L2-normalises output. Repeated
+        queries within QUERY_CACHE_TTL seconds skip the model; the key is
+        case-folded, which the uncased tokenizer does anyway.
 
         Args:
             query: Natural language query string.
@@ -84,13 +151,20 @@ class NomicEmbedder:
         Returns:
             Float32 numpy array of shape (1, 768).
         """
+        key = query.strip().lower()
+        now = time.monotonic()
+        cached = self._query_cache.get(key)
+        if cached is not None and cached[0] > now:
+            self._query_cache.move_to_end(key)
+            return cached[1].copy()
+
         await self._ensure_loaded()
         prefixed = [PREFIX_QUERY + query]
-        vector = await asyncio.to_thread(
-            self._model.encode,
-            prefixed,
-            convert_to_numpy=True,
-            normalize_embeddings=True,
-            show_progress_bar=False,
-        )
-        return vector.astype(np.float32)
+        vector = await asyncio.to_thread(self._encode, prefixed)
+        vector = vector.astype(np.float32, copy=False)
+
+        self._query_cache[key] = (now + QUERY_CACHE_TTL, vector.copy())
+        self._query_cache.move_to_end(key)
+        while len(self._query_cache) > QUERY_CACHE_SIZE:
+            self._query_cache.popitem(last=False)
+        return vector
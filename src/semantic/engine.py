@@ -3,21 +3,27 @@
 Lifecycle:
   1. init(): Load saved index or build from scratch.
   2. search(query): Embed → FAISS top-50 → rerank → return top-k.
-  3. on_file_changed(path, type): Incremental index update.
-  4. save(): Persist index to disk (called on shutdown).
+  3. on_files_changed(changes): Batched incremental index update.
+     on_file_changed(path, type) queues a single file; queued changes are
+     coalesced over CHANGE_BATCH_WINDOW seconds and applied as one batch.
+  4. close(): Apply any queued changes; save(): Persist index to disk.
 """
 
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Literal
 
+import numpy as np
 import structlog
 
 from src.config import Settings
-from src.semantic.chunker import FileChunker
+from src.semantic.chunker import Chunk, FileChunker, decode_text
 from src.semantic.embedder import NomicEmbedder
 from src.semantic.reranker import CrossEncoderReranker
 from src.semantic.faiss_index import FAISSIndex
@@ -26,15 +32,50 @@ log = structlog.get_logger()
 
 ChangeType = Literal["A", "M", "D"]  # Added, Modified, Deleted
 
-
-def _file_sha256(path: Path) -> str:
-    """Compute SHA-256 of a file's content."""
-    h = hashlib.sha256()
+HASH_WORKERS = 8  # Threads used to hash files during a full index build
+BUILD_BATCH_SIZE = 256  # Chunks per embed/add step during a full build
+BUILD_QUEUE_SIZE = 4  # Chunk batches buffered ahead of the embedder
+SEARCH_CANDIDATES = 50  # FAISS hits per query handed to the reranker
+SEARCH_BATCH_MAX = 32  # Most queued queries answered by one FAISS call
+
+# Reranker skip: FAISS order is trusted when the top_k-th hit scores above
+# RERANK_SKIP_MIN_SCORE and clears the last candidate by RERANK_SKIP_GAP.
+# Otherwise only hits within RERANK_WINDOW of the best (at least top_k)
+# are reranked.
+RERANK_SKIP_MIN_SCORE = 0.6
+RERANK_SKIP_GAP = 0.08
+RERANK_WINDOW = 0.1
+CHANGE_BATCH_WINDOW = 0.5  # Seconds to collect queued file changes per batch
+
+
+def _rerank_candidates(
+    candidates: list[dict], top_k: int
+) -> tuple[list[dict], bool]:
+    """Trim FAISS candidates (sorted by score) for the reranker.
+
+    Returns (candidates, rerank): rerank is False when the FAISS scores
+    are clearly separated and the first top_k can be returned as is.
+    """
+    if len(candidates) > top_k:
+        cutoff = candidates[top_k - 1]["score"]
+        if (
+            cutoff > RERANK_SKIP_MIN_SCORE
+            and cutoff - candidates[-1]["score"] > RERANK_SKIP_GAP
+        ):
+            return candidates[:top_k], False
+
+    floor = candidates[0]["score"] - RERANK_WINDOW
+    keep = max(top_k, sum(1 for c in candidates if c["score"] >= floor))
+    return candidates[:keep], True
+
+
+def _file_sha256(path: Path) -> str | None:
+    """Compute SHA-256 of a file's content, streamed (None if unreadable)."""
     try:
-        h.update(path.read_bytes())
-    except Exception:
-        pass
-    return h.hexdigest()
+        with open(path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    except OSError:
+        return None
 
 
 class SemanticSearchEngine:
@@ -42,17 +83,35 @@ class SemanticSearchEngine:
 
     def __init__(self, settings: Settings):
         self._settings = settings
-        self._repo_path = Path(settings.repo_dir)
-        self._index_path = Path(settings.index_dir)
+        self._repo_path = settings.repo_path
+        self._index_path = settings.index_path
 
         self._chunker = FileChunker(chunk_size=1000, overlap=200)
         self._embedder = NomicEmbedder()
-        self._reranker = CrossEncoderReranker()
-        self._faiss = FAISSIndex(self._index_path)
+        self._reranker = CrossEncoderReranker(
+            onnx_dir=self._index_path / "reranker-onnx"
+        )
+        self._faiss = FAISSIndex(
+            self._index_path,
+            nprobe=settings.faiss_nprobe,
+            memory_mappable=settings.faiss_mmap,
+        )
 
         # Lock prevents concurrent index modification
         self._write_lock = asyncio.Lock()
 
+        # Single-file changes queued for the batching task (latest type wins)
+        self._pending: dict[str, ChangeType] = {}
+        self._pending_event = asyncio.Event()
+        self._batch_task: asyncio.Task | None = None
+        self._closing = False
+
+        # Queries waiting for the FAISS search task (vector, result future)
+        self._search_queue: asyncio.Queue[
+            tuple[np.ndarray, asyncio.Future[list[dict]]]
+        ] = asyncio.Queue()
+        self._search_task: asyncio.Task | None = None
+
     # ------------------------------------------------------------------
     # Initialisation
     # ------------------------------------------------------------------
@@ -68,38 +127,121 @@ class SemanticSearchEngine:
         else:
             log.info("search_engine_building_index")
             await self._build_full_index()
+        self._start_batching()
 
     async def _build_full_index(self):
-        """Scan entire repo and build index from scratch."""
+        """Scan entire repo and build index from scratch.
+
+        Chunking, embedding and FAISS adds run as a pipeline: a producer
+        thread streams chunk batches through a bounded queue, and each
+        batch is added to FAISS while the next one embeds. Only a few
+        batches are held in memory at once.
+        """
         async with self._write_lock:
-            all_chunks = await asyncio.to_thread(
-                self._chunker.chunk_directory, self._repo_path
+            loop = asyncio.get_running_loop()
+            queue: asyncio.Queue[list[Chunk] | None] = asyncio.Queue(
+                maxsize=BUILD_QUEUE_SIZE
             )
-
-            if not all_chunks:
+            stop = threading.Event()
+            producer = asyncio.ensure_future(
+                asyncio.to_thread(self._produce_batches, loop, queue, stop)
+            )
+            try:
+                total_chunks = await self._consume_batches(queue)
+            finally:
+                # Unblock and wait for the producer if the consumer failed
+                stop.set()
+                while not producer.done():
+                    while not queue.empty():
+                        queue.get_nowait()
+                    await asyncio.sleep(0.01)
+                await producer
+
+            if not total_chunks:
                 log.warning("search_engine_no_chunks")
                 return
 
-            log.info("search_engine_embedding", chunks=len(all_chunks))
-            texts = [c.text for c in all_chunks]
-            vectors = await self._embedder.embed_documents(texts)
-
-            self._faiss.add(all_chunks, vectors)
-
-            # Record file hashes
-            for chunk in all_chunks:
-                file_abs = self._repo_path / chunk.file_path
-                if file_abs.exists():
-                    self._faiss.set_file_hash(
-                        chunk.file_path, _file_sha256(file_abs)
-                    )
-
             self._faiss.save()
             log.info(
                 "search_engine_index_built",
+                chunks=total_chunks,
                 total_vectors=self._faiss.total_vectors,
             )
 
+    def _produce_batches(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        queue: asyncio.Queue[list[Chunk] | None],
+        stop: threading.Event,
+    ):
+        """Chunk the repo (worker thread) and queue BUILD_BATCH_SIZE batches."""
+        def put(item: list[Chunk] | None):
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        try:
+            batch: list[Chunk] = []
+            for chunks in self._chunker.iter_directory(self._repo_path):
+                if stop.is_set():
+                    return
+                batch.extend(chunks)
+                if len(batch) >= BUILD_BATCH_SIZE:
+                    put(batch)
+                    batch = []
+            if batch:
+                put(batch)
+        finally:
+            put(None)
+
+    async def _consume_batches(
+        self, queue: asyncio.Queue[list[Chunk] | None]
+    ) -> int:
+        """Embed and index queued batches; returns the number of chunks."""
+        total = 0
+        add_task: asyncio.Future | None = None
+        hash_tasks: list[tuple[list[str], asyncio.Future]] = []
+        seen_files: set[str] = set()
+        try:
+            while (batch := await queue.get()) is not None:
+                # Hash each file once, in parallel, while its chunks embed
+                new_files = [
+                    p for p in dict.fromkeys(c.file_path for c in batch)
+                    if p not in seen_files
+                ]
+                seen_files.update(new_files)
+                hash_tasks.append((new_files, asyncio.ensure_future(
+                    asyncio.to_thread(self._hash_files, new_files)
+                )))
+
+                vectors = await self._embedder.embed_documents(
+                    [c.text for c in batch]
+                )
+                # FAISS isn't safe for concurrent adds: one batch at a time,
+                # off the loop (may train the IVF-PQ index on a large corpus)
+                if add_task is not None:
+                    await add_task
+                add_task = asyncio.ensure_future(
+                    asyncio.to_thread(self._faiss.add, batch, vectors)
+                )
+                total += len(batch)
+                log.info("search_engine_embedded", chunks=total)
+        finally:
+            if add_task is not None:
+                await add_task
+
+        # Record file hashes
+        for file_paths, task in hash_tasks:
+            for file_path, file_hash in zip(file_paths, await task):
+                if file_hash is not None:
+                    self._faiss.set_file_hash(file_path, file_hash)
+        return total
+
+    def _hash_files(self, file_paths: list[str]) -> list[str | None]:
+        """SHA-256 of each repo file; hashlib releases the GIL, so threads overlap."""
+        with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+            return list(pool.map(
+                lambda p: _file_sha256(self._repo_path / p), file_paths
+            ))
+
     # ------------------------------------------------------------------
     # Search
     # ------------------------------------------------------------------
@@ -107,6 +249,10 @@ class SemanticSearchEngine:
     async def search(self, query: str, top_k: int = 10) -> list[dict]:
         """Search the repo with semantic similarity + reranking.
 
+        The cross-encoder is skipped when FAISS scores are clearly
+        separated, or if it fails; the returned score is then the cosine
+        similarity of the bi-encoder embeddings.
+
         Args:
             query: Natural language search query.
             top_k: Number of results to return.
@@ -117,41 +263,45 @@ class SemanticSearchEngine:
         # Embed query
         query_vector = await self._embedder.embed_query(query)
 
-        # FAISS retrieval (get top 50 candidates for reranking)
-        candidates_meta = self._faiss.search(query_vector, top_k=50)
+        # FAISS retrieval (top candidates for reranking), batched with any
+        # concurrent queries
+        candidates_meta = await self._faiss_search(query_vector)
         if not candidates_meta:
             return []
+        candidates_meta, rerank = _rerank_candidates(candidates_meta, top_k)
 
-        # Reconstruct chunk objects for reranking (we need the text)
-        from src.semantic.chunker import Chunk
-
+        # Build chunk objects for reranking from the stored chunk text
         chunks = []
+        legacy_files: dict[str, str | None] = {}
         for meta in candidates_meta:
-            try:
-                file_abs = self._repo_path / meta["file_path"]
-                if not file_abs.is_file():
+            text = meta["text"]
+            if text is None:
+                # Index saved before chunk text was stored: slice the file
+                text = self._legacy_chunk_text(meta, legacy_files)
+                if text is None:
                     continue
-                content = file_abs.read_text(encoding="utf-8", errors="ignore")
-                text = content[meta["char_start"]:meta["char_end"]]
-                chunk = Chunk(
-                    id=meta["chunk_id"],
-                    file_path=meta["file_path"],
-                    char_start=meta["char_start"],
-                    char_end=meta["char_end"],
-                    text=text,
-                )
-                chunks.append(chunk)
-            except Exception:
-                log.exception(
-                    "search_chunk_reconstruct_error",
-                    file=meta.get("file_path"),
-                )
+            chunks.append(Chunk(
+                id=meta["chunk_id"],
+                file_path=meta["file_path"],
+                char_start=meta["char_start"],
+                char_end=meta["char_end"],
+                text=text,
+            ))
 
         if not chunks:
             return []
 
-        # Rerank
-        ranked = await self._reranker.rerank(query, chunks, top_k=top_k)
+        # Rerank, unless the FAISS scores already settle the order
+        ranked = None
+        if rerank:
+            try:
+                ranked = await self._reranker.rerank(query, chunks, top_k=top_k)
+            except Exception:
+                # e.g. the model failed to load: degrade to bi-encoder order
+                log.exception("search_rerank_failed")
+        if ranked is None:
+            scores = {m["chunk_id"]: m["score"] for m in candidates_meta}
+            ranked = [(c, scores[c.id]) for c in chunks[:top_k]]
 
         # Format results
         results = []
@@ -165,66 +315,242 @@ class SemanticSearchEngine:
 
         return results
 
+    async def _faiss_search(self, query_vector: np.ndarray) -> list[dict]:
+        """Queue a query for the search task and wait for its candidates."""
+        if self._search_task is None or self._search_task.done():
+            self._search_task = asyncio.create_task(self._batch_searches())
+        future = asyncio.get_running_loop().create_future()
+        await self._search_queue.put((query_vector, future))
+        return await future
+
+    async def _batch_searches(self):
+        """Answer queued queries, up to SEARCH_BATCH_MAX per FAISS call.
+
+        Never waits for a batch to fill: a lone query is searched at once,
+        and queries that arrive while a search runs form the next batch,
+        so FAISS parallelises across them under concurrent load.
+        """
+        while True:
+            batch = [await self._search_queue.get()]
+            while len(batch) < SEARCH_BATCH_MAX and not self._search_queue.empty():
+                batch.append(self._search_queue.get_nowait())
+            batch = [(v, f) for v, f in batch if not f.done()]  # drop cancelled
+            if not batch:
+                continue
+
+            vectors = np.vstack([v for v, _ in batch])
+            try:
+                results = await asyncio.to_thread(
+                    self._faiss.search_batch, vectors, SEARCH_CANDIDATES
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def _legacy_chunk_text(
+        self, meta: dict, contents: dict[str, str | None]
+    ) -> str | None:
+        """Slice a chunk's text from disk (each file read once per search).
+
+        Legacy offsets index the file as read in text mode ("\\r\\n" is one
+        character); decode_text translates line endings the same way.
+        """
+        file_path = meta["file_path"]
+        if file_path not in contents:
+            try:
+                data = (self._repo_path / file_path).read_bytes()
+                contents[file_path] = decode_text(data)
+            except FileNotFoundError:
+                contents[file_path] = None
+            except OSError:
+                log.exception("search_chunk_reconstruct_error", file=file_path)
+                contents[file_path] = None
+        content = contents[file_path]
+        if content is None:
+            return None
+        return content[meta["char_start"]:meta["char_end"]]
+
     # ------------------------------------------------------------------
     # Incremental updates
     # ------------------------------------------------------------------
 
     async def on_file_changed(self, file_path: str, change_type: ChangeType):
-        """Update index when a file is added, modified, or deleted.
+        """Queue an index update for a file that was added, modified, or deleted.
+
+        Returns immediately; the batching task applies every change queued
+        within CHANGE_BATCH_WINDOW seconds in one on_files_changed call, so
+        a burst of writes costs a single embedder call.
 
         Args:
             file_path: Relative path from repo root.
             change_type: "A" (added), "M" (modified), "D" (deleted).
         """
-        file_abs = self._repo_path / file_path
+        self._pending[file_path] = change_type
+        self._pending_event.set()
+        self._start_batching()
 
-        # Check if this is a file we should index
-        if change_type in ("A", "M"):
-            if not self._chunker.is_indexable(file_abs):
-                return
-            if not file_abs.is_file():
-                return
+    async def on_folder_changed(self, old_path: str, new_path: str | None = None):
+        """Queue updates for every indexed file under a deleted or moved folder.
 
-        async with self._write_lock:
-            if change_type == "D":
-                self._faiss.remove_file(file_path)
-                log.debug("search_index_removed", file=file_path)
+        The folder is expanded against the files already in the index rather
+        than by walking the disk (the old tree is gone by now). Moved files
+        are queued as additions under new_path; the batching task then
+        applies the whole subtree in one on_files_changed call.
 
+        Args:
+            old_path: Relative path of the deleted or renamed folder.
+            new_path: Relative destination of a rename, or None for a delete.
+        """
+        old_prefix = old_path.strip("/")
+        files = await asyncio.to_thread(self._faiss.files_under, old_prefix)
+        for file_path in files:
+            self._pending[file_path] = "D"
+            if new_path is not None:
+                moved = new_path.strip("/") + file_path[len(old_prefix):]
+                self._pending[moved] = "A"
+        if files:
+            self._pending_event.set()
+            self._start_batching()
+        log.debug("search_folder_changed", path=old_path, files=len(files))
+
+    def _start_batching(self):
+        """Start the batching task if it isn't running."""
+        if self._closing:
+            return
+        if self._batch_task is None or self._batch_task.done():
+            self._batch_task = asyncio.create_task(self._batch_changes())
+
+    async def _batch_changes(self):
+        """Apply queued file changes, one batch per CHANGE_BATCH_WINDOW."""
+        while not self._closing:
+            await self._pending_event.wait()
+            if not self._closing:
+                await asyncio.sleep(CHANGE_BATCH_WINDOW)
+            try:
+                await self._flush_pending()
+            except Exception:
+                log.exception("search_index_batch_error")
+
+    async def _flush_pending(self):
+        """Apply all queued file changes now."""
+        self._pending_event.clear()
+        if not self._pending:
+            return
+        changes, self._pending = list(self._pending.items()), {}
+        await self.on_files_changed(changes)
+
+    async def on_files_changed(self, changes: list[tuple[str, ChangeType]]):
+        """Apply a batch of file changes to the index.
+
+        Deleted files are dropped; added/modified files are read
+        concurrently, and all of their chunks are embedded in a single
+        embedder call and added to FAISS at once.
+
+        Args:
+            changes: (file_path, change_type) tuples, e.g. from a git pull.
+        """
+        deletes: list[str] = []
+        upserts: list[str] = []
+        for file_path, change_type in changes:
+            if change_type == "D":
+                deletes.append(file_path)
             elif change_type in ("A", "M"):
-                # Check if content actually changed (skip if identical hash)
-                new_hash = _file_sha256(file_abs)
-                old_hash = self._faiss.get_file_hash(file_path)
+                # Check if this is a file we should index (the is-a-file
+                # check happens in the worker thread, along with the read)
+                if self._chunker.is_indexable(self._repo_path / file_path):
+                    upserts.append(file_path)
+
+        if not deletes and not upserts:
+            return
+
+        async with self._write_lock:
+            # Read and hash off the event loop, all files concurrently
+            contents = await asyncio.gather(*(
+                asyncio.to_thread(self._read_and_hash, file_path)
+                for file_path in upserts
+            ))
+
+            stale = list(deletes)
+            new_chunks = []
+            new_hashes: dict[str, str] = {}
+            for file_path, result in zip(upserts, contents):
+                if result is None:
+                    continue
+                data, new_hash = result
 
-                if new_hash == old_hash:
+                # Check if content actually changed (skip if identical hash)
+                if new_hash == self._faiss.get_file_hash(file_path):
                     log.debug("search_index_skip_unchanged", file=file_path)
-                    return
+                    continue
 
-                # Remove old chunks (if any)
-                self._faiss.remove_file(file_path)
+                # Old chunks (if any) are removed below
+                stale.append(file_path)
 
-                # Chunk + embed the new version
-                try:
-                    content = file_abs.read_text(encoding="utf-8", errors="ignore")
-                    new_chunks = self._chunker.chunk_file(file_path, content)
+                content = decode_text(data)
+                file_chunks = self._chunker.chunk_file(file_path, content)
+                if file_chunks:
+                    new_chunks.extend(file_chunks)
+                    new_hashes[file_path] = new_hash
 
-                    if new_chunks:
-                        texts = [c.text for c in new_chunks]
-                        vectors = await self._embedder.embed_documents(texts)
-                        self._faiss.add(new_chunks, vectors)
-                        self._faiss.set_file_hash(file_path, new_hash)
+            # Drop deleted files and superseded chunks in one FAISS pass,
+            # off the loop (removal scans the whole flat index)
+            if stale:
+                await asyncio.to_thread(self._faiss.remove_files, stale)
+                log.debug("search_index_removed", files=len(stale))
 
-                    log.debug(
-                        "search_index_updated",
-                        file=file_path,
-                        chunks=len(new_chunks),
-                    )
-                except Exception:
-                    log.exception("search_index_update_error", file=file_path)
+            if not new_chunks:
+                return
+
+            # Embed every changed file's chunks in one batch
+            try:
+                texts = [c.text for c in new_chunks]
+                vectors = await self._embedder.embed_documents(texts)
+                await asyncio.to_thread(self._faiss.add, new_chunks, vectors)
+                for file_path, new_hash in new_hashes.items():
+                    self._faiss.set_file_hash(file_path, new_hash)
+
+                log.debug(
+                    "search_index_updated",
+                    files=len(new_hashes),
+                    chunks=len(new_chunks),
+                )
+            except Exception:
+                log.exception("search_index_update_error", files=list(new_hashes))
+
+    def _read_and_hash(self, file_path: str) -> tuple[bytes, str] | None:
+        """Read a repo file and its SHA-256; None if it isn't a readable file."""
+        try:
+            data = (self._repo_path / file_path).read_bytes()
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+        except OSError:
+            log.exception("search_index_read_error", file=file_path)
+            return None
+        return data, hashlib.sha256(data).hexdigest()
 
     # ------------------------------------------------------------------
     # Persistence
     # ------------------------------------------------------------------
 
+    async def close(self):
+        """Stop the background tasks and apply any changes still queued."""
+        self._closing = True
+        self._pending_event.set()
+        if self._search_task is not None:
+            self._search_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._search_task
+            self._search_task = None
+        if self._batch_task is not None:
+            await self._batch_task
+            self._batch_task = None
+        await self._flush_pending()
+
     def save(self):
         """Save index to disk (called on shutdown)."""
         self._faiss.save()
@@ -1,22 +1,28 @@
 """FAISS index wrapper with incremental add/remove support.
 
-Uses IndexIDMap(IndexFlatIP) so:
+Starts as IndexIDMap(IndexFlatIP) (exact search) and, once the corpus is
+large enough to train on, converts itself to IVF-PQ (IVF_PQ_FACTORY):
   - Each chunk gets a custom int64 ID
   - Vectors can be removed by ID without full rebuild
   - Inner product on L2-normalised vectors = cosine similarity
+  - IVF-PQ stores ~40 bytes/vector instead of 3 KB and probes only
+    `nprobe` inverted lists per query
 
 Two sidecar JSON files are persisted alongside the FAISS binary:
-  - chunk_meta.json  : {chunk_id_str: {file_path, char_start, char_end}}
+  - chunk_meta.json  : columnar {format, files, ids, file_index, char_start,
+                       char_end, text}, each file path stored once
   - file_hashes.json : {file_path: sha256_hash}  (for incremental detection)
 """
 
 from __future__ import annotations
 
-import json
+import functools
+import threading
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, NamedTuple
 
 import numpy as np
+import orjson
 import structlog
 
 if TYPE_CHECKING:
@@ -29,17 +35,89 @@ INDEX_FILENAME = "index.faiss"
 CHUNK_META_FILENAME = "chunk_meta.json"
 FILE_HASHES_FILENAME = "file_hashes.json"
 
+# Compressed index layout: 256 inverted lists, 32 x 8-bit PQ codes
+IVF_PQ_FACTORY = "IVF256,PQ32x8"
+# Vectors needed before switching to IVF-PQ (FAISS wants ~39 training
+# points per centroid; below this the exact flat index is also fast)
+IVF_MIN_VECTORS = 256 * 39
+DEFAULT_NPROBE = 8
+
+# chunk_meta.json layout version (older files are a dict keyed by id string)
+CHUNK_META_FORMAT = 2
+
+
+class ChunkMeta(NamedTuple):
+    """Per-chunk metadata kept in memory (a tuple, not a dict, per chunk)."""
+    file_path: str
+    char_start: int
+    char_end: int
+    text: str | None  # None for chunks saved before text was stored
+
+
+def _locked(method):
+    """Run a FAISSIndex method while holding the instance lock."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _unpack_chunk_meta(data: dict) -> dict[int, ChunkMeta]:
+    """Inverse of FAISSIndex._pack_chunk_meta; also reads the legacy layout."""
+    if data.get("format") != CHUNK_META_FORMAT:
+        # Legacy: {chunk_id_str: {file_path, char_start, char_end[, text]}}
+        return {
+            int(id_str): ChunkMeta(
+                m["file_path"], m["char_start"], m["char_end"], m.get("text")
+            )
+            for id_str, m in data.items()
+        }
+    files = data["files"]
+    return {
+        chunk_id: ChunkMeta(files[f], start, end, text)
+        for chunk_id, f, start, end, text in zip(
+            data["ids"], data["file_index"], data["char_start"],
+            data["char_end"], data["text"],
+        )
+    }
+
+
+def _write_atomic(path: Path, data: bytes):
+    """Write data to a temp file beside path, then rename it into place."""
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(data)
+    tmp.replace(path)
+
 
 class FAISSIndex:
     """FAISS IndexIDMap wrapping IndexFlatIP for cosine-similarity search."""
 
-    def __init__(self, index_dir: Path):
+    def __init__(
+        self,
+        index_dir: Path,
+        nprobe: int = DEFAULT_NPROBE,
+        memory_mappable: bool = False,
+    ):
         self._index_dir = index_dir
+        self._nprobe = nprobe
+        # load() maps a flat index's vectors instead of reading them; the
+        # mapping is read-only, so the first update loads the file for real
+        self._memory_mappable = memory_mappable
+        self._mapped = False
         self._index_dir.mkdir(parents=True, exist_ok=True)
 
         self._index = None          # faiss.IndexIDMap
-        self._chunk_meta: dict[str, dict] = {}   # id_str -> {file_path, char_start, char_end}
+        self._chunk_meta: dict[int, ChunkMeta] = {}   # chunk id -> metadata
         self._file_hashes: dict[str, str] = {}   # file_path -> sha256
+        # Reverse map file_path -> chunk ids, rebuilt from _chunk_meta on load
+        self._file_to_ids: dict[str, set[int]] = {}
+        # Unsaved changes: index + chunk meta, and file hashes, respectively
+        self._dirty = False
+        self._hashes_dirty = False
+        # FAISS indexes aren't safe for concurrent reads and writes, and
+        # searches and updates both run in worker threads
+        self._lock = threading.RLock()
 
         self._init_index()
 
@@ -53,19 +131,37 @@ class FAISSIndex:
     # Persistence
     # ------------------------------------------------------------------
 
+    @_locked
     def save(self):
-        """Save FAISS index and sidecar metadata to disk."""
+        """Save FAISS index and sidecar metadata to disk.
+
+        Only the parts changed since the last save/load are written, each
+        to a temp file that is then renamed over the original, so a crash
+        mid-save never leaves a truncated index behind.
+
+        The chunk metadata goes first and the file hashes last. A crash
+        before the index is replaced leaves metadata that load() rejects by
+        its vector count; a crash before the hashes leaves old hashes, so
+        the changed files are simply re-embedded on the next sync.
+        """
         import faiss
-        faiss.write_index(
-            self._index,
-            str(self._index_dir / INDEX_FILENAME),
-        )
-        (self._index_dir / CHUNK_META_FILENAME).write_text(
-            json.dumps(self._chunk_meta), encoding="utf-8"
-        )
-        (self._index_dir / FILE_HASHES_FILENAME).write_text(
-            json.dumps(self._file_hashes), encoding="utf-8"
-        )
+
+        if not self._dirty and not self._hashes_dirty:
+            return
+        if self._dirty:
+            _write_atomic(
+                self._index_dir / CHUNK_META_FILENAME,
+                orjson.dumps(self._pack_chunk_meta()),
+            )
+            path = self._index_dir / INDEX_FILENAME
+            tmp = path.with_suffix(path.suffix + ".tmp")
+            faiss.write_index(self._index, str(tmp))
+            tmp.replace(path)
+        if self._hashes_dirty:
+            _write_atomic(
+                self._index_dir / FILE_HASHES_FILENAME, orjson.dumps(self._file_hashes)
+            )
+        self._dirty = self._hashes_dirty = False
         log.info("faiss_saved", vectors=self._index.ntotal)
 
     def load(self) -> bool:
@@ -83,44 +179,133 @@ class FAISSIndex:
             return False
 
         try:
-            self._index = faiss.read_index(str(index_path))
+            self._index, self._mapped = self._read_index(index_path)
+            self._apply_nprobe()
             if meta_path.exists():
-                self._chunk_meta = json.loads(meta_path.read_text(encoding="utf-8"))
+                self._chunk_meta = _unpack_chunk_meta(
+                    orjson.loads(meta_path.read_bytes())
+                )
+            if len(self._chunk_meta) != self._index.ntotal:
+                # A save interrupted between the metadata and the index
+                raise ValueError(
+                    f"chunk metadata has {len(self._chunk_meta)} entries, "
+                    f"index has {self._index.ntotal} vectors"
+                )
             if hashes_path.exists():
-                self._file_hashes = json.loads(hashes_path.read_text(encoding="utf-8"))
+                self._file_hashes = orjson.loads(hashes_path.read_bytes())
+            self._rebuild_file_to_ids()
+            self._dirty = self._hashes_dirty = False
 
-            log.info("faiss_loaded", vectors=self._index.ntotal)
+            log.info("faiss_loaded", vectors=self._index.ntotal, mapped=self._mapped)
             return True
         except Exception:
             log.exception("faiss_load_failed")
             self._init_index()
+            self._mapped = False
             self._chunk_meta = {}
             self._file_hashes = {}
+            self._file_to_ids = {}
             return False
 
+    def _read_index(self, index_path: Path):
+        """Read the index file, memory-mapped if requested and supported.
+
+        Returns (index, mapped). A FAISS build without mmap support, or one
+        that can't map this index, falls back to a plain read instead of
+        being treated as a corrupt index.
+        """
+        import faiss
+
+        if self._memory_mappable:
+            # IO_FLAG_MMAP_IFC only exists in recent FAISS releases
+            mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+            if mmap_flag is None:
+                log.warning("faiss_mmap_unsupported", version=faiss.__version__)
+            else:
+                try:
+                    index = faiss.read_index(
+                        str(index_path), mmap_flag | faiss.IO_FLAG_READ_ONLY
+                    )
+                    return index, True
+                except RuntimeError:
+                    log.warning("faiss_mmap_failed", exc_info=True)
+        return faiss.read_index(str(index_path)), False
+
+    def _ensure_writable(self):
+        """Replace a memory-mapped index with an in-memory copy.
+
+        FAISS aborts the process when a mapped index is resized, so this
+        must run before any add or remove. The file on disk still matches
+        the mapping: save() only writes after an update, and every update
+        comes through here first.
+        """
+        if not self._mapped:
+            return
+        import faiss
+
+        self._index = faiss.read_index(str(self._index_dir / INDEX_FILENAME))
+        self._mapped = False
+        self._apply_nprobe()
+        log.info("faiss_unmapped", vectors=self._index.ntotal)
+
+    def _pack_chunk_meta(self) -> dict:
+        """Columnar form of the chunk metadata, each file path stored once."""
+        file_index = {path: i for i, path in enumerate(self._file_to_ids)}
+        metas = self._chunk_meta.values()
+        return {
+            "format": CHUNK_META_FORMAT,
+            "files": list(file_index),
+            "ids": list(self._chunk_meta),
+            "file_index": [file_index[m.file_path] for m in metas],
+            "char_start": [m.char_start for m in metas],
+            "char_end": [m.char_end for m in metas],
+            "text": [m.text for m in metas],
+        }
+
+    def _rebuild_file_to_ids(self):
+        """Recompute the file -> chunk ids map in one pass over the metadata."""
+        self._file_to_ids = {}
+        for chunk_id, meta in self._chunk_meta.items():
+            self._file_to_ids.setdefault(meta.file_path, set()).add(chunk_id)
+
     # ------------------------------------------------------------------
     # Incremental operations
     # ------------------------------------------------------------------
 
+    @_locked
     def add(self, chunks: list["Chunk"], vectors: np.ndarray):
         """Add chunks and their vectors to the index.
 
         Args:
             chunks: List of Chunk objects (for metadata).
-            vectors: Float32 array of shape (len(chunks), 768).
+            vectors: Float32 array of shape (len(chunks), 768); rows are
+                L2-normalised in place.
         """
         if not chunks:
             return
 
-        ids = np.array([c.id for c in chunks], dtype=np.int64)
-        self._index.add_with_ids(vectors.astype(np.float32), ids)
+        import faiss
 
+        self._ensure_writable()
+        ids = np.fromiter((c.id for c in chunks), dtype=np.int64, count=len(chunks))
+        # No copy when the embedder already returned contiguous float32;
+        # normalising in place enforces the cosine-similarity invariant.
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        faiss.normalize_L2(vectors)
+        if (
+            self._is_flat()
+            and self._index.ntotal + len(ids) >= IVF_MIN_VECTORS
+        ):
+            self._convert_to_ivf_pq(vectors, ids)
+        else:
+            self._index.add_with_ids(vectors, ids)
+
+        self._dirty = True
         for chunk in chunks:
-            self._chunk_meta[str(chunk.id)] = {
-                "file_path": chunk.file_path,
-                "char_start": chunk.char_start,
-                "char_end": chunk.char_end,
-            }
+            self._file_to_ids.setdefault(chunk.file_path, set()).add(chunk.id)
+            self._chunk_meta[chunk.id] = ChunkMeta(
+                chunk.file_path, chunk.char_start, chunk.char_end, chunk.text
+            )
 
         log.debug("faiss_add", count=len(chunks), total=self._index.ntotal)
 
@@ -130,34 +315,40 @@ class FAISSIndex:
         Args:
             file_path: Relative file path to remove.
         """
-        import faiss
+        self.remove_files([file_path])
 
-        # Find chunk IDs for this file
-        ids_to_remove = [
-            int(id_str)
-            for id_str, meta in self._chunk_meta.items()
-            if meta["file_path"] == file_path
-        ]
+    @_locked
+    def remove_files(self, file_paths: list[str]):
+        """Remove all chunks of several files with a single FAISS call.
+
+        Args:
+            file_paths: Relative file paths to remove.
+        """
+        ids_to_remove: set[int] = set()
+        for file_path in file_paths:
+            ids_to_remove.update(self._file_to_ids.pop(file_path, ()))
+            # Remove file hash
+            if self._file_hashes.pop(file_path, None) is not None:
+                self._hashes_dirty = True
 
         if not ids_to_remove:
             return
 
-        id_array = np.array(ids_to_remove, dtype=np.int64)
-        selector = faiss.IDSelectorBatch(
-            len(id_array), faiss.swig_ptr(id_array)
-        )
-        self._index.remove_ids(selector)
+        self._ensure_writable()
+        # The faiss wrapper turns an int64 array into an IDSelectorBatch
+        # (hash set), so membership checks stay O(1) per stored vector,
+        # and one call scans the index once for every file.
+        id_array = np.fromiter(ids_to_remove, dtype=np.int64, count=len(ids_to_remove))
+        self._index.remove_ids(id_array)
+        self._dirty = True
 
         # Remove from metadata
-        for id_str in [str(i) for i in ids_to_remove]:
-            self._chunk_meta.pop(id_str, None)
-
-        # Remove file hash
-        self._file_hashes.pop(file_path, None)
+        for chunk_id in ids_to_remove:
+            self._chunk_meta.pop(chunk_id, None)
 
         log.debug(
-            "faiss_remove_file",
-            file=file_path,
+            "faiss_remove_files",
+            files=len(file_paths),
             removed=len(ids_to_remove),
             total=self._index.ntotal,
         )
@@ -166,44 +357,125 @@ class FAISSIndex:
         """Search for nearest neighbours.
 
         Args:
-            query_vector: Float32 array of shape (1, 768).
+            query_vector: Float32 array of shape (1, 768); normalised in place.
             top_k: Number of candidates to retrieve.
 
         Returns:
-            List of dicts: {chunk_id, score, file_path, char_start, char_end}
+            List of dicts: {chunk_id, score, file_path, char_start, char_end,
+            text}. ``text`` is None for chunks saved by older versions.
+        """
+        return self.search_batch(query_vector, top_k)[0]
+
+    @_locked
+    def search_batch(
+        self, query_vectors: np.ndarray, top_k: int = 50
+    ) -> list[list[dict]]:
+        """Search several queries in one FAISS call (parallel across rows).
+
+        Args:
+            query_vectors: Float32 array of shape (n, 768); normalised in place.
+            top_k: Number of candidates to retrieve per query.
+
+        Returns:
+            One result list per query row, as described in search().
         """
         if self._index.ntotal == 0:
-            return []
+            return [[] for _ in range(len(query_vectors))]
+
+        import faiss
 
+        query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+        faiss.normalize_L2(query_vectors)
         k = min(top_k, self._index.ntotal)
-        distances, indices = self._index.search(query_vector, k)
-
-        results = []
-        for score, idx in zip(distances[0], indices[0]):
-            if idx == -1:
-                continue
-            meta = self._chunk_meta.get(str(idx))
-            if meta is None:
-                continue
-            results.append({
-                "chunk_id": idx,
-                "score": float(score),
-                "file_path": meta["file_path"],
-                "char_start": meta["char_start"],
-                "char_end": meta["char_end"],
-            })
-
-        return results
+        distances, indices = self._index.search(query_vectors, k)
+
+        # tolist() converts each row in one C pass, so the loop below works
+        # on plain ints/floats instead of boxing a numpy scalar per element
+        chunk_meta = self._chunk_meta
+        batch = []
+        for row_scores, row_ids in zip(distances.tolist(), indices.tolist()):
+            results = []
+            for score, idx in zip(row_scores, row_ids):
+                meta = chunk_meta.get(idx)  # FAISS pads missing results with -1
+                if meta is None:
+                    continue
+                results.append({
+                    "chunk_id": idx,
+                    "score": score,
+                    "file_path": meta.file_path,
+                    "char_start": meta.char_start,
+                    "char_end": meta.char_end,
+                    "text": meta.text,
+                })
+            batch.append(results)
+
+        return batch
+
+    # ------------------------------------------------------------------
+    # IVF-PQ conversion
+    # ------------------------------------------------------------------
+
+    def _is_flat(self) -> bool:
+        import faiss
+        return not isinstance(self._index, faiss.IndexIVF)
+
+    def _convert_to_ivf_pq(self, new_vectors: np.ndarray, new_ids: np.ndarray):
+        """Replace the flat index with an IVF-PQ index trained on all vectors.
+
+        The flat index's stored vectors plus the incoming batch are used
+        both to train the quantisers and to populate the new index.
+        """
+        import faiss
+
+        n = self._index.ntotal
+        if n:
+            flat = faiss.downcast_index(self._index.index)
+            old_vectors = flat.reconstruct_n(0, n)
+            old_ids = faiss.vector_to_array(self._index.id_map)
+            vectors = np.vstack([old_vectors, new_vectors])
+            ids = np.concatenate([old_ids, new_ids])
+        else:
+            vectors, ids = new_vectors, new_ids
+
+        index = faiss.index_factory(
+            EMBEDDING_DIM, IVF_PQ_FACTORY, faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(vectors)
+        # IVF indexes store custom IDs and support remove_ids natively
+        index.add_with_ids(vectors, ids)
+        self._index = index
+        self._apply_nprobe()
+        log.info("faiss_converted_ivf_pq", vectors=index.ntotal)
+
+    def _apply_nprobe(self):
+        import faiss
+        if isinstance(self._index, faiss.IndexIVF):
+            self._index.nprobe = self._nprobe
 
     # ------------------------------------------------------------------
     # Hash helpers for incremental indexing
     # ------------------------------------------------------------------
 
+    @_locked
+    def files_under(self, prefix: str) -> list[str]:
+        """Return the indexed files at or below a repo-relative folder path."""
+        prefix = prefix.strip("/")
+        if not prefix:
+            return list(self._file_hashes.keys() | self._file_to_ids.keys())
+        folder = prefix + "/"
+        return [
+            path
+            for path in self._file_hashes.keys() | self._file_to_ids.keys()
+            if path == prefix or path.startswith(folder)
+        ]
+
     def get_file_hash(self, file_path: str) -> str | None:
         return self._file_hashes.get(file_path)
 
     def set_file_hash(self, file_path: str, hash_val: str):
-        self._file_hashes[file_path] = hash_val
+        if self._file_hashes.get(file_path) != hash_val:
+            self._file_hashes[file_path] = hash_val
+            self._hashes_dirty = True
 
     @property
     def total_vectors(self) -> int:
@@ -0,0 +1,8 @@
+"""MCP tool implementations (CRUD + semantic search)."""
+
+import orjson
+
+
+def to_json(obj) -> str:
+    """Compact JSON for tool responses (orjson, decoded to str for MCP)."""
+    return orjson.dumps(obj).decode()
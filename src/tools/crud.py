@@ -1,53 +1,607 @@
 """14 CRUD MCP tools — all operate on the local Git clone."""
 
-import json
+import asyncio
+import codecs
+import contextlib
+import errno
+import functools
 import os
+import re
 import shutil
-import subprocess
+import stat
+import tempfile
+import time
+from collections import OrderedDict
+from collections.abc import Callable
 from pathlib import Path
+from typing import BinaryIO
 
+import orjson
 import structlog
 
 from mcp.server.fastmcp import FastMCP
 
+from src.tools import to_json
 from src.tools.validators import safe_path, relative_to_repo, PathValidationError
 
 log = structlog.get_logger()
 
-# These will be set by main.py at startup via app.state
-_repo_dir: Path | None = None
-_debouncer = None
-_search_engine = None
-
-
-def _get_repo_dir():
-    """Get the repo directory — injected from main at startup."""
-    from src.main import settings
-    return Path(settings.repo_dir)
-
-
-def _get_debouncer():
-    from src.main import debouncer
-    return debouncer
-
-
-def _get_search_engine():
-    from src.main import search_engine
-    return search_engine
-
-
-async def _notify_write(file_path: str, change_type: str = "M"):
-    """Notify debouncer and search engine of a file change."""
-    deb = _get_debouncer()
-    se = _get_search_engine()
-    if deb:
-        await deb.notify_write(file_path)
-    if se:
-        await se.on_file_changed(file_path, change_type)
-
-
-def register_crud_tools(mcp: FastMCP):
-    """Register all 14 CRUD tools on the given FastMCP server."""
+# list_folder / flat list_files responses, keyed by (kind, dir) and
+# validated against the directory's mtime and the listed files' sizes
+LISTING_CACHE_SIZE = 128
+LISTING_CACHE_MIN_AGE_NS = 2_000_000_000
+_listing_cache: OrderedDict[
+    tuple[str, str], tuple[int, str, tuple[tuple[str, int], ...]]
+] = OrderedDict()
+
+# search_files limits
+SEARCH_MAX_MATCHES = 100
+SEARCH_TIMEOUT = 30  # seconds
+# Longest match line returned; minified files otherwise flood the reply
+SEARCH_MAX_LINE_CHARS = 300
+# Bytes of one output line kept from the search tool; git grep and grep
+# print matching lines whole, and the rest of a longer line is dropped
+SEARCH_LINE_LIMIT = 1 << 20
+
+# Directory names list_files(recursive=True) skips unless told otherwise
+DEFAULT_EXCLUDE_DIRS = frozenset({".git", "node_modules", "__pycache__", ".venv"})
+
+# list_files results larger than this are left in walk order (unsorted)
+LIST_SORT_MAX_FILES = 10_000
+
+# Characters decoded (or bytes copied) per read when slicing or
+# splicing a file
+READ_BLOCK_CHARS = 1 << 20
+READ_BLOCK_BYTES = 1 << 20
+
+# Queries without these are searched as fixed strings (no regex engine)
+_REGEX_META = re.compile(r"[.^$*+?()\[\]{}|\\]")
+
+
+class SearchError(Exception):
+    """Raised when the search tool itself fails (e.g. an invalid pattern)."""
+
+
+# Looked up once: shutil.which stats every $PATH entry
+_RG_PATH = shutil.which("rg")
+_GIT_PATH = shutil.which("git")
+
+
+def _search_command(
+    query: str,
+    target: Path,
+    case_sensitive: bool,
+    extensions: tuple[str, ...] = (),
+) -> list[str]:
+    """argv for search_files: ripgrep when installed, otherwise GNU grep.
+
+    Both skip binary files; extensions limits the search to those suffixes.
+    grep gets -E so patterns mean the same as in ripgrep (extended regex:
+    ``( ) + ? | { }`` are operators, not literals).
+    """
+    if _RG_PATH:
+        # Parallel walk, SIMD matching, skips .git and .gitignore'd paths
+        cmd = [
+            _RG_PATH, "--json", "-n",
+            f"--max-count={SEARCH_MAX_MATCHES}",
+            f"--max-columns={SEARCH_MAX_LINE_CHARS}", "--max-columns-preview",
+        ]
+        cmd.extend(f"--glob=*.{ext}" for ext in extensions)
+    else:
+        cmd = ["grep", "-rnI", "--exclude-dir=.git"]
+        cmd.extend(f"--include=*.{ext}" for ext in extensions)
+    if not case_sensitive:
+        cmd.append("-i")
+    if not _REGEX_META.search(query):
+        cmd.append("-F")
+    elif not _RG_PATH:
+        cmd.append("-E")
+    cmd.extend(["--", query, str(target)])
+    return cmd
+
+
+def _git_grep_command(
+    query: str,
+    target: Path,
+    case_sensitive: bool,
+    extensions: tuple[str, ...] = (),
+) -> list[str]:
+    """argv for searching a git work tree with ``git grep``.
+
+    Tracked files are enumerated from the git index instead of walking the
+    tree; --untracked adds new files the server hasn't pushed yet, and
+    ignored files are skipped either way. Regex queries use -E, the same
+    extended syntax as the ripgrep / grep fallback.
+    """
+    cmd = [_GIT_PATH, "grep", "-n", "-z", "-I", "--untracked", "--no-color"]
+    if not case_sensitive:
+        cmd.append("-i")
+    cmd.append("-E" if _REGEX_META.search(query) else "-F")
+    cmd.extend(["-e", query, "--"])
+    # Pathspec wildcards match across "/", so these cover subfolders too
+    if extensions:
+        cmd.extend(str(target / f"*.{ext}") for ext in extensions)
+    else:
+        cmd.append(str(target))
+    return cmd
+
+
+@functools.lru_cache(maxsize=8)
+def _is_git_worktree(repo_dir: Path) -> bool:
+    """True if repo_dir is a git clone that ``git grep`` can search."""
+    return _GIT_PATH is not None and (repo_dir / ".git" / "HEAD").is_file()
+
+
+def _parse_rg_line(line: bytes) -> tuple[str, int, str] | None:
+    """(file, line number, text) from a ``rg --json`` match record."""
+    record = orjson.loads(line)
+    if record.get("type") != "match":
+        return None
+    data = record["data"]
+    path, text = data["path"].get("text"), data["lines"].get("text")
+    if path is None or text is None:  # non-UTF-8, sent base64-encoded
+        return None
+    return path, data["line_number"] or 0, text
+
+
+# One C-level match per output line; only the groups are decoded
+_GIT_GREP_LINE = re.compile(rb"([^\0]*)\0(\d+)\0(.*)", re.DOTALL)
+_GREP_LINE = re.compile(rb"([^:\n]*):(\d+):(.*)", re.DOTALL)
+
+
+def _match_line(pattern: re.Pattern, line: bytes) -> tuple[str, int, str] | None:
+    m = pattern.match(line)
+    if m is None:
+        return None
+    path, line_no, text = m.groups()
+    return (
+        path.decode("utf-8", errors="replace"),
+        int(line_no),
+        text.decode("utf-8", errors="replace"),
+    )
+
+
+def _parse_git_grep_line(line: bytes) -> tuple[str, int, str] | None:
+    """(file, line number, text) from a NUL-separated ``git grep -z`` line."""
+    return _match_line(_GIT_GREP_LINE, line)
+
+
+def _parse_grep_line(line: bytes) -> tuple[str, int, str] | None:
+    """(file, line number, text) from a ``file:line:content`` grep line."""
+    return _match_line(_GREP_LINE, line)
+
+
+async def _run_search(
+    query: str,
+    target: Path,
+    repo_dir: Path,
+    case_sensitive: bool,
+    extensions: tuple[str, ...] = (),
+) -> list[dict]:
+    """Run the search subprocess, streaming up to SEARCH_MAX_MATCHES matches.
+
+    Uses ``git grep`` inside a git clone, falling back to ripgrep / grep
+    if it fails; every backend reads the query as an extended regex.
+    Raises SearchError if the fallback fails (e.g. an invalid pattern) and
+    TimeoutError after SEARCH_TIMEOUT seconds.
+    """
+    if _is_git_worktree(repo_dir):
+        cmd = _git_grep_command(query, target, case_sensitive, extensions)
+        matches, returncode, error = await _stream_matches(
+            cmd, _parse_git_grep_line, repo_dir
+        )
+        # 0 = matches, 1 = no matches; anything else is a git error
+        if matches or returncode in (0, 1):
+            return matches
+        log.warning("search_git_grep_failed", returncode=returncode, error=error)
+
+    cmd = _search_command(query, target, case_sensitive, extensions)
+    parse = _parse_rg_line if _RG_PATH else _parse_grep_line
+    matches, returncode, error = await _stream_matches(cmd, parse, repo_dir)
+    # rg and grep exit with 2 on errors such as an invalid pattern; with
+    # no matches to show, report it rather than an empty result
+    if not matches and returncode not in (0, 1, None):
+        raise SearchError(error or f"search exited with status {returncode}")
+    return matches
+
+
+async def _read_lines(stream: asyncio.StreamReader):
+    """Yield lines from stream; lines over its limit are cut at the limit.
+
+    StreamReader's own iteration raises on an over-long line, which would
+    abort the whole search over one minified file.
+    """
+    while True:
+        try:
+            yield await stream.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                yield e.partial
+            return
+        except asyncio.LimitOverrunError as e:
+            head = await stream.readexactly(e.consumed)
+            # Discard the rest of the line
+            while True:
+                try:
+                    await stream.readuntil(b"\n")
+                    break
+                except asyncio.LimitOverrunError as rest:
+                    await stream.readexactly(rest.consumed)
+                except asyncio.IncompleteReadError:
+                    break
+            yield head
+
+
+async def _stream_matches(
+    cmd: list[str], parse, repo_dir: Path
+) -> tuple[list[dict], int | None, str]:
+    """Collect parsed matches from cmd's stdout, its exit status and stderr.
+
+    The exit status is None when the process was killed early; stderr is
+    cut to its last line (where grep tools put the fatal error).
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        cwd=str(repo_dir),
+        limit=SEARCH_LINE_LIMIT,
+    )
+    # Drained concurrently so a chatty stderr can't block the child
+    stderr_task = asyncio.ensure_future(proc.stderr.read())
+    matches = []
+    finished = False
+    try:
+        async with asyncio.timeout(SEARCH_TIMEOUT):
+            async for line in _read_lines(proc.stdout):
+                try:
+                    match = parse(line)
+                except ValueError:  # a cut-off rg JSON record
+                    continue
+                if match is None:
+                    continue
+                file_abs, line_no, content = match
+                try:
+                    rel = relative_to_repo(Path(file_abs), repo_dir)
+                except Exception:
+                    rel = file_abs
+                matches.append({
+                    "file": rel,
+                    "line": line_no,
+                    "content": content.strip()[:SEARCH_MAX_LINE_CHARS],
+                })
+                if len(matches) >= SEARCH_MAX_MATCHES:
+                    break
+            else:
+                finished = True
+    finally:
+        # Stop the walk early once we have enough (or on timeout)
+        if not finished and proc.returncode is None:
+            with contextlib.suppress(ProcessLookupError):
+                proc.kill()
+        await proc.wait()
+        stderr = await stderr_task
+    lines = stderr.decode("utf-8", errors="replace").strip().splitlines()
+    error = lines[-1] if lines else ""
+    return matches, proc.returncode if finished else None, error
+
+
+# ---------------------------------------------------------------------------
+# Blocking file helpers (run via asyncio.to_thread, off the event loop)
+# ---------------------------------------------------------------------------
+
+def _stat_or_none(path: Path) -> os.stat_result | None:
+    """stat() a path, or None if it doesn't exist.
+
+    One syscall answers both "exists?" and "file or directory?", which
+    exists() + is_file() would ask separately.
+    """
+    try:
+        return path.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
+def _read_text(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def _read_char_range(path: Path, start: int, end: int) -> tuple[str, int]:
+    """Characters [start, end) of a UTF-8 file, plus its total length.
+
+    Decodes the file in READ_BLOCK_CHARS blocks and keeps only the
+    requested slice, so a small range of a large file never holds the
+    whole text in memory. The file is read in text mode, so "\\r\\n" is
+    one "\\n" character, matching semantic_search positions.
+    """
+    parts = []
+    pos = 0
+    with open(path, encoding="utf-8") as f:
+        while block := f.read(READ_BLOCK_CHARS):
+            block_end = pos + len(block)
+            if block_end > start and pos < end:
+                parts.append(block[max(start - pos, 0):end - pos])
+            pos = block_end
+    return "".join(parts), pos
+
+
+def _write_text(path: Path, content: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+
+
+def _append_text(path: Path, content: str) -> int:
+    """Append to a file and return its new size in bytes."""
+    with open(path, "ab") as f:
+        f.write(content.encode("utf-8"))
+        return f.tell()
+
+
+def _text_mode_len(text: str) -> int:
+    """Length of text as read in text mode, where "\\r\\n" is one character."""
+    return len(text) - text.count("\r\n")
+
+
+def _raw_index(text: str, position: int) -> int:
+    """Index into text of text-mode character ``position``."""
+    raw = 0
+    for piece in text.split("\r\n"):
+        if position <= len(piece):
+            break
+        position -= len(piece) + 1
+        raw += len(piece) + 2
+    return raw + position
+
+
+def _char_to_byte_offset(f: BinaryIO, position: int) -> tuple[int, int]:
+    """Byte offset of character ``position`` in a UTF-8 stream.
+
+    Positions count characters as read in text mode ("\\r\\n" is one),
+    like read_range. Decodes only up to the position, a block at a time.
+    Returns (byte_offset, char_position), clamped to the end of the stream.
+    Raises UnicodeDecodeError if the bytes before it aren't UTF-8.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    chars = 0
+    offset = 0
+    pending = ""
+    while True:
+        block = f.read(READ_BLOCK_BYTES)
+        text = pending + decoder.decode(block, final=not block)
+        pending = ""
+        if block and text.endswith("\r"):
+            # The "\n" of a "\r\n" may start the next block
+            text, pending = text[:-1], "\r"
+        n = _text_mode_len(text)
+        if chars + n >= position:
+            raw = _raw_index(text, position - chars)
+            return offset + len(text[:raw].encode("utf-8")), position
+        chars += n
+        # Bytes of an incomplete trailing character stay in the decoder
+        offset += len(text.encode("utf-8"))
+        if not block:
+            return offset, chars
+
+
+def _count_chars(blocks, after_cr: bool = False) -> int:
+    """Text-mode character count of a stream of UTF-8 byte blocks.
+
+    after_cr: the stream follows a "\\r", so a leading "\\n" completes
+    an already-counted line ending.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    chars = 0
+    for block in blocks:
+        text = decoder.decode(block)
+        if not text:
+            continue
+        chars += _text_mode_len(text)
+        if after_cr and text[0] == "\n":
+            chars -= 1
+        after_cr = text[-1] == "\r"
+    decoder.decode(b"", final=True)
+    return chars
+
+
+def _insert_text(path: Path, position: int, content: str) -> tuple[int, int]:
+    """Splice content into a file at a character position.
+
+    Bytes are copied around the insertion point into a temp file that
+    then replaces the original, so the file is never held in memory or
+    left half-written; the copied tail is decoded only to count it.
+
+    Returns:
+        (clamped character position, new file length in characters),
+        both counted in text mode like read_range.
+    """
+    with open(path, "rb") as src:
+        byte_pos, pos = _char_to_byte_offset(src, position)
+        src.seek(0)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "wb") as dst:
+                remaining = byte_pos
+                block = b""
+                while remaining:
+                    block = src.read(min(remaining, READ_BLOCK_BYTES))
+                    if not block:
+                        break
+                    dst.write(block)
+                    remaining -= len(block)
+                after_cr = block.endswith(b"\r")
+                data = content.encode("utf-8")
+                dst.write(data)
+
+                def tail():
+                    yield data
+                    while block := src.read(READ_BLOCK_BYTES):
+                        dst.write(block)
+                        yield block
+
+                # The prefix is already counted; count the rest as it's copied
+                new_size = pos + _count_chars(tail(), after_cr)
+            shutil.copymode(path, tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    return pos, new_size
+
+
+def _rel_prefix(folder: Path, repo_dir: Path) -> str:
+    """Repo-relative path of folder with a trailing slash ("" for the root)."""
+    rel = relative_to_repo(folder, repo_dir)
+    return "" if rel == "." else rel + "/"
+
+
+def _scan_folder(target: Path, repo_dir: Path) -> tuple[list[dict], list[dict]]:
+    """(dirs, files) entries of one folder for list_folder, skipping .git."""
+    prefix = _rel_prefix(target, repo_dir)
+    dirs = []
+    files = []
+    # scandir's entries carry the file type, so only files need a stat()
+    with os.scandir(target) as it:
+        for entry in sorted(it, key=lambda e: e.name):
+            # Skip .git directory
+            if entry.name == ".git":
+                continue
+            rel = prefix + entry.name
+            if entry.is_dir():
+                dirs.append({"name": entry.name, "path": rel})
+            else:
+                files.append({
+                    "name": entry.name,
+                    "path": rel,
+                    "size": entry.stat().st_size,
+                })
+    return dirs, files
+
+
+def _scan_files(
+    target: Path,
+    repo_dir: Path,
+    recursive: bool,
+    exclude_dirs: frozenset[str] = DEFAULT_EXCLUDE_DIRS,
+) -> list[dict]:
+    """File entries under a folder for list_files.
+
+    Excluded directories are pruned from the walk rather than filtered
+    afterwards, so e.g. the .git object store is never enumerated. Like
+    rglob, symlinked directories are not descended into.
+    """
+    files = []
+    folders = [(target, _rel_prefix(target, repo_dir))]
+    while folders:
+        folder, prefix = folders.pop()
+        with os.scandir(folder) as it:
+            for entry in it:
+                if entry.name == ".git":
+                    continue
+                if entry.is_file():
+                    files.append({
+                        "name": entry.name,
+                        "path": prefix + entry.name,
+                        "size": entry.stat().st_size,
+                    })
+                elif (
+                    recursive
+                    and entry.name not in exclude_dirs
+                    and entry.is_dir(follow_symlinks=False)
+                ):
+                    folders.append((Path(entry.path), prefix + entry.name + "/"))
+    # Same order as sorting the Paths: component by component. Huge trees
+    # are returned in walk order instead of paying for the sort.
+    if len(files) <= LIST_SORT_MAX_FILES:
+        files.sort(key=lambda f: f["path"].split("/"))
+    return files
+
+
+def _get_cached_listing(
+    key: tuple[str, str], mtime_ns: int
+) -> tuple[str, tuple[tuple[str, int], ...]] | None:
+    """(listing JSON, file sizes) cached for a directory, if its mtime hasn't moved.
+
+    The directory's mtime only covers adding, removing and renaming
+    entries; check the sizes with _sizes_unchanged before serving.
+    """
+    hit = _listing_cache.get(key)
+    if hit is None or hit[0] != mtime_ns:
+        return None
+    _listing_cache.move_to_end(key)
+    return hit[1], hit[2]
+
+
+def _sizes_unchanged(directory: str, sizes: tuple[tuple[str, int], ...]) -> bool:
+    """True if every (name, size) in directory still has that size.
+
+    Editing a file in place doesn't touch its directory's mtime, so a
+    listing is only served if the sizes it reports are still current.
+    """
+    for name, size in sizes:
+        try:
+            if os.stat(os.path.join(directory, name)).st_size != size:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def _cache_listing(
+    key: tuple[str, str], mtime_ns: int, listing: str, files: list[dict]
+):
+    # A second change within the filesystem's timestamp granularity
+    # wouldn't move the mtime, so recently modified dirs aren't cached
+    if time.time_ns() - mtime_ns < LISTING_CACHE_MIN_AGE_NS:
+        return
+    sizes = tuple((f["name"], f["size"]) for f in files)
+    _listing_cache[key] = (mtime_ns, listing, sizes)
+    _listing_cache.move_to_end(key)
+    while len(_listing_cache) > LISTING_CACHE_SIZE:
+        _listing_cache.popitem(last=False)
+
+
+def invalidate_listing_cache():
+    """Forget cached listings, e.g. after a pull rewrote files."""
+    _listing_cache.clear()
+
+
+def register_crud_tools(
+    mcp: FastMCP,
+    get_repo_dir: Callable[[], Path],
+    get_debouncer: Callable[[], object],
+    get_search_engine: Callable[[], object],
+):
+    """Register all 14 CRUD tools on the given FastMCP server.
+
+    The components only exist once the app has started, so the tools
+    resolve them through the getters on each call.
+    """
+
+    async def _notify_write(file_path: str, change_type: str = "M"):
+        """Notify debouncer and search engine of a file change."""
+        invalidate_listing_cache()
+        deb = get_debouncer()
+        se = get_search_engine()
+        if deb:
+            await deb.notify_write(file_path)
+        if se:
+            await se.on_file_changed(file_path, change_type)
+
+    async def _notify_folder_write(old_path: str, new_path: str | None = None):
+        """Notify debouncer and search engine of a folder delete or rename.
+
+        The debouncer gets the folder paths themselves (a folder makes the
+        push check the whole tree); the search engine expands the folder.
+        """
+        invalidate_listing_cache()
+        deb = get_debouncer()
+        se = get_search_engine()
+        if deb:
+            await deb.notify_write(old_path)
+            if new_path is not None:
+                await deb.notify_write(new_path)
+        if se:
+            await se.on_folder_changed(old_path, new_path)
 
     # ------------------------------------------------------------------
     # READ operations
@@ -63,67 +617,80 @@ def register_crud_tools(mcp: FastMCP):
         Returns:
             JSON with 'dirs' and 'files' arrays.
         """
-        repo_dir = _get_repo_dir()
+        repo_dir = get_repo_dir()
         try:
             target = safe_path(path, repo_dir)
         except PathValidationError as e:
-            return json.dumps({"error": str(e)})
-
-        if not target.exists():
-            return json.dumps({"error": f"Path '{path}' does not exist"})
-        if not target.is_dir():
-            return json.dumps({"error": f"Path '{path}' is not a directory"})
-
-        dirs = []
-        files = []
-        for entry in sorted(target.iterdir()):
-            # Skip .git directory
-            if entry.name == ".git":
-                continue
-            rel = relative_to_repo(entry, repo_dir)
-            if entry.is_dir():
-                dirs.append({"name": entry.name, "path": rel})
-            else:
-                files.append({
-                    "name": entry.name,
-                    "path": rel,
-                    "size": entry.stat().st_size,
-                })
-
-        return json.dumps({"dirs": dirs, "files": files}, indent=2)
+            return to_json({"error": str(e)})
+
+        st = _stat_or_none(target)
+        if st is None:
+            return to_json({"error": f"Path '{path}' does not exist"})
+        if not stat.S_ISDIR(st.st_mode):
+            return to_json({"error": f"Path '{path}' is not a directory"})
+
+        key = ("folder", str(target))
+        hit = _get_cached_listing(key, st.st_mtime_ns)
+        if hit is not None and await asyncio.to_thread(
+            _sizes_unchanged, key[1], hit[1]
+        ):
+            return hit[0]
+
+        dirs, files = await asyncio.to_thread(_scan_folder, target, repo_dir)
+        listing = to_json({"dirs": dirs, "files": files})
+        _cache_listing(key, st.st_mtime_ns, listing, files)
+        return listing
 
     @mcp.tool()
-    async def list_files(path: str = "", recursive: bool = False) -> str:
+    async def list_files(
+        path: str = "",
+        recursive: bool = False,
+        exclude_dirs: list[str] | None = None,
+    ) -> str:
         """List files in a folder.
 
         Args:
             path: Relative path from repo root. Empty for root.
             recursive: If True, list files recursively in all subdirectories.
+            exclude_dirs: Directory names not to descend into when recursive.
+                Defaults to .git, node_modules, __pycache__ and .venv;
+                .git is always excluded.
 
         Returns:
-            JSON array of file objects with name, path, and size.
+            JSON array of file objects with name, path, and size, sorted
+            by path unless there are more than 10,000 of them.
         """
-        repo_dir = _get_repo_dir()
+        repo_dir = get_repo_dir()
         try:
             target = safe_path(path, repo_dir)
         except PathValidationError as e:
-            return json.dumps({"error": str(e)})
-
-        if not target.exists() or not target.is_dir():
-            return json.dumps({"error": f"Directory '{path}' not found"})
-
-        files = []
-        iterator = target.rglob("*") if recursive else target.iterdir()
-        for entry in sorted(iterator):
-            if entry.is_file() and ".git" not in entry.parts:
-                rel = relative_to_repo(entry, repo_dir)
-                files.append({
-                    "name": entry.name,
-                    "path": rel,
-                    "size": entry.stat().st_size,
-                })
-
-        return json.dumps(files, indent=2)
+            return to_json({"error": str(e)})
+
+        st = _stat_or_none(target)
+        if st is None or not stat.S_ISDIR(st.st_mode):
+            return to_json({"error": f"Directory '{path}' not found"})
+
+        # A directory's mtime only tracks its direct children, so only
+        # flat listings are cached
+        key = ("files", str(target))
+        if not recursive:
+            hit = _get_cached_listing(key, st.st_mtime_ns)
+            if hit is not None and await asyncio.to_thread(
+                _sizes_unchanged, key[1], hit[1]
+            ):
+                return hit[0]
+
+        excluded = (
+            DEFAULT_EXCLUDE_DIRS if exclude_dirs is None
+            else frozenset(exclude_dirs) | {".git"}
+        )
+        files = await asyncio.to_thread(
+            _scan_files, target, repo_dir, recursive, excluded
+        )
+        listing = to_json(files)
+        if not recursive:
+            _cache_listing(key, st.st_mtime_ns, listing, files)
+        return listing
 
     @mcp.tool()
     async def read_file(path: str) -> str:
@@ -135,27 +702,30 @@ def register_crud_tools(mcp: FastMCP):
         Returns:
             The file content as text.
         """
-        repo_dir = _get_repo_dir()
+        repo_dir = get_repo_dir()
         try:
             target = safe_path(path, repo_dir)
         except PathValidationError as e:
-            return json.dumps({"error": str(e)})
+            return to_json({"error": str(e)})
 
-        if not target.exists():
-            return json.dumps({"error": f"File '{path}' not found"})
-        if not target.is_file():
-            return json.dumps({"error": f"'{path}' is not a file"})
+        st = _stat_or_none(target)
+        if st is None:
+            return to_json({"error": f"File '{path}' not found"})
+        if not stat.S_ISREG(st.st_mode):
+            return to_json({"error": f"'{path}' is not a file"})
 
         try:
-            content = target.read_text(encoding="utf-8")
-            return content
+            return await asyncio.to_thread(_read_text, target)
         except UnicodeDecodeError:
-            return json.dumps({"error": f"File '{path}' is binary, cannot read as text"})
+            return to_json({"error": f"File '{path}' is binary, cannot read as text"})
 
     @mcp.tool()
     async def read_range(path: str, start: int, end: int) -> str:
         """Read a specific character range from a file.
 
+        Line endings are normalised to "\\n" (a "\\r\\n" pair counts as one
+        character), the same positions semantic_search reports.
+
         Args:
             path: Relative path to the file.
             start: Start character position (0-indexed, inclusive).
@@ -164,81 +734,74 @@ def register_crud_tools(mcp: FastMCP):
         Returns:
             The substring from start to end, plus metadata.
         """
-        repo_dir = _get_repo_dir()
+        repo_dir = get_repo_dir()
         try:
             target = safe_path(path, repo_dir)
         except PathValidationError as e:
-            return json.dumps({"error": str(e)})
+            return to_json({"error": str(e)})
 
-        if not target.exists() or not target.is_file():
-            return json.dumps({"error": f"File '{path}' not found"})
+        st = _stat_or_none(target)
+        if st is None or not stat.S_ISREG(st.st_mode):
+            return to_json({"error": f"File '{path}' not found"})
 
+        start = max(0, start)
         try:
-            content = target.read_text(encoding="utf-8")
+            content, total = await asyncio.to_thread(
+                _read_char_range, target, start, end
+            )
         except UnicodeDecodeError:
-            return json.dumps({"error": "Binary file"})
+            return to_json({"error": "Binary file"})
 
-        total = len(content)
-        start = max(0, start)
         end = min(end, total)
 
-        return json.dumps({
-            "content": content[start:end],
+        return to_json({
+            "content": content,
             "range": f"{start}-{end}",
             "total_length": total,
         })
 
     @mcp.tool()
-    async def search_files(query: str, path: str = "", case_sensitive: bool = False) -> str:
-        """Search for text across files using grep.
+    async def search_files(
+        query: str,
+        path: str = "",
+        case_sensitive: bool = False,
+        extensions: list[str] | None = None,
+    ) -> str:
+        """Search for text across files using git grep (ripgrep or grep outside a clone).
+
+        Binary files are skipped and long lines are cut to 300 characters.
+
+        A query containing any of ``. ^ $ * + ? ( ) [ ] { } | \\`` is an
+        extended regular expression (as in ``grep -E``): ``( ) + ? | { }``
+        are operators, so escape them with a backslash to match them
+        literally, e.g. ``print\\(``. Other queries are matched as plain
+        text.
 
         Args:
             query: Text pattern to search for.
             path: Subfolder to limit the search. Empty for entire repo.
             case_sensitive: Whether the search is case-sensitive.
+            extensions: Only search files with these extensions (e.g. ["md"]).
 
         Returns:
             JSON array of matches with file, line number, and content.
         """
-        repo_dir = _get_repo_dir()
+        repo_dir = get_repo_dir()
         try:
             target = safe_path(path, repo_dir) if path else repo_dir
         except PathValidationError as e:
-            return json.dumps({"error": str(e)})
-
-        cmd = ["grep", "-rn", "--include=*"]
-        if not case_sensitive:
-            cmd.append("-i")
-        cmd.extend(["--", query, str(target)])
+            return to_json({"error": str(e)})
 
         try:
-            result = subprocess.run(
-                cmd, capture_output=True, text=True, timeout=30,
-                cwd=str(repo_dir),
+            exts = tuple(e.lstrip("*.") for e in extensions or () if e.lstrip("*."))
+            matches = await _run_search(
+                query, target, repo_dir, case_sensitive, exts
             )
-            matches = []
-            for line in result.stdout.strip().split("\n")[:100]:  # Cap at 100
-                if not line:
-                    continue
-                # Format: file:line_num:content
-                parts = line.split(":", 2)
-                if len(parts) >= 3:
-                    file_abs = parts[0]
-                    try:
-                        rel = relative_to_repo(Path(file_abs), repo_dir)
-                    except Exception:
-                        rel = file_abs
-                    matches.append({
-                        "file": rel,
-                        "line": int(parts[1]) if parts[1].isdigit() else 0,
-                        "content": parts[2].strip(),
-                    })
-
-            return json.dumps(matches, indent=2)
-        except subprocess.TimeoutExpired:
-            return json.dumps({"error": "Search timed out after 30 seconds"})
+            return to_json(matches)
+        except TimeoutError:
+            return to_json({"error": f"Search timed out after {SEARCH_TIMEOUT} seconds"})
         except Exception as e:
-            return json.dumps({"error": str(e)})
+            return to_json({"error": str(e)})
 
     # ------------------------------------------------------------------
     # WRITE operations
@@ -254,14 +817,14 @@ def register_crud_tools(mcp: FastMCP):
         Returns:
             Success or error message.
         """
-        repo_dir = _get_repo_dir()
+        repo_dir = get_repo_dir()
         try:
             target = safe_path(path, repo_dir)
         except PathValidationError as e:
-            return json.dumps({"error": str(e)})
+            return to_json({"error": str(e)})
 
         if target.exists():
-            return json.dumps({"error": f"Path '{path}' already exists"})
+            return to_json({"error": f"Path '{path}' already exists"})
 
         target.mkdir(parents=True, exist_ok=True)
 
@@ -270,7 +833,7 @@ def register_crud_tools(mcp: FastMCP):
         gitkeep.touch()
 
         await _notify_write(path, "A")
-        return json.dumps({"success": True, "path": path})
+        return to_json({"success": True, "path": path})
 
     @mcp.tool()
     async def add_file(path: str, content: str) -> str:
@@ -283,21 +846,20 @@ def register_crud_tools(mcp: FastMCP):
         Returns:
             Success with path and size, or error if file already exists.
         """
-        repo_dir = _get_repo_dir()
+        repo_dir = get_repo_dir()
         try:
             target = safe_path(path, repo_dir)
         except PathValidationError as e:
-            return json.dumps({"error": str(e)})
+            return to_json({"error": str(e)})
 
         if target.exists():
-            return json.dumps({"error": f"File '{path}' already exists. Use edit_file to modify."})
+            return to_json({"error": f"File '{path}' already exists. Use edit_file to modify."})
 
-        # Ensure parent directories exist
-        target.parent.mkdir(parents=True, exist_ok=True)
-        target.write_text(content, encoding="utf-8")
+        # Creates parent directories as needed
+        await asyncio.to_thread(_write_text, target, content)
 
         await _notify_write(path, "A")
-        return json.dumps({
+        return to_json({
             "success": True,
             "path": path,
             "size": len(content),
@@ -314,21 +876,22 @@ def register_crud_tools(mcp: FastMCP):
         Returns:
             Success with path and new size, or error.
         """
-        repo_dir = _get_repo_dir()
+        repo_dir = get_repo_dir()
         try:
             target = safe_path(path, repo_dir)
         except PathValidationError as e:
-            return json.dumps({"error": str(e)})
+            return to_json({"error": str(e)})
 
-        if not target.exists():
-            return json.dumps({"error": f"File '{path}' not found. Use add_file to create."})
-        if not target.is_file():
-            return json.dumps({"error": f"'{path}' is not a file"})
+        st = _stat_or_none(target)
+        if st is None:
+            return to_json({"error": f"File '{path}' not found. Use add_file to create."})
+        if not stat.S_ISREG(st.st_mode):
+            return to_json({"error": f"'{path}' is not a file"})
 
-        target.write_text(content, encoding="utf-8")
+        await asyncio.to_thread(_write_text, target, content)
 
         await _notify_write(path, "M")
-        return json.dumps({
+        return to_json({
             "success": True,
             "path": path,
             "size": len(content),
@@ -345,24 +908,25 @@ def register_crud_tools(mcp: FastMCP):
         Returns:
             Success or error message.
         """
-        repo_dir = _get_repo_dir()
+        repo_dir = get_repo_dir()
         try:
             source = safe_path(old_path, repo_dir)
             dest = safe_path(new_path, repo_dir)
         except PathValidationError as e:
-            return json.dumps({"error": str(e)})
+            return to_json({"error": str(e)})
 
-        if not source.exists() or not source.is_file():
-            return json.dumps({"error": f"File '{old_path}' not found"})
+        st = _stat_or_none(source)
+        if st is None or not stat.S_ISREG(st.st_mode):
+            return to_json({"error": f"File '{old_path}' not found"})
         if dest.exists():
-            return json.dumps({"error": f"Destination '{new_path}' already exists"})
+            return to_json({"error": f"Destination '{new_path}' already exists"})
 
         dest.parent.mkdir(parents=True, exist_ok=True)
         source.rename(dest)
 
         await _notify_write(old_path, "D")
         await _notify_write(new_path, "A")
-        return json.dumps({
+        return to_json({
             "success": True,
             "old_path": old_path,
             "new_path": new_path,
@@ -379,24 +943,33 @@ def register_crud_tools(mcp: FastMCP):
         Returns:
             Success or error message.
         """
-        repo_dir = _get_repo_dir()
+        repo_dir = get_repo_dir()
         try:
             source = safe_path(old_path, repo_dir)
             dest = safe_path(new_path, repo_dir)
         except PathValidationError as e:
-            return json.dumps({"error": str(e)})
+            return to_json({"error": str(e)})
 
-        if not source.exists() or not source.is_dir():
-            return json.dumps({"error": f"Folder '{old_path}' not found"})
+        st = _stat_or_none(source)
+        if st is None or not stat.S_ISDIR(st.st_mode):
+            return to_json({"error": f"Folder '{old_path}' not found"})
         if dest.exists():
-            return json.dumps({"error": f"Destination '{new_path}' already exists"})
+            return to_json({"error": f"Destination '{new_path}' already exists"})
 
         dest.parent.mkdir(parents=True, exist_ok=True)
-        shutil.move(str(source), str(dest))
-
-        await _notify_write(old_path, "D")
-        await _notify_write(new_path, "A")
-        return json.dumps({
+        try:
+            # Same filesystem (the usual case): one metadata-only syscall
+            os.rename(source, dest)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Crossing filesystems copies the whole tree
+            await asyncio.to_thread(shutil.move, str(source), str(dest))
+
+        await _notify_folder_write(
+            relative_to_repo(source, repo_dir), relative_to_repo(dest, repo_dir)
+        )
+        return to_json({
             "success": True,
             "old_path": old_path,
             "new_path": new_path,
@@ -412,21 +985,22 @@ def register_crud_tools(mcp: FastMCP):
         Returns:
             Success or error message.
         """
-        repo_dir = _get_repo_dir()
+        repo_dir = get_repo_dir()
         try:
             target = safe_path(path, repo_dir)
         except PathValidationError as e:
-            return json.dumps({"error": str(e)})
+            return to_json({"error": str(e)})
 
-        if not target.exists():
-            return json.dumps({"error": f"File '{path}' not found"})
-        if not target.is_file():
-            return json.dumps({"error": f"'{path}' is not a file"})
+        st = _stat_or_none(target)
+        if st is None:
+            return to_json({"error": f"File '{path}' not found"})
+        if not stat.S_ISREG(st.st_mode):
+            return to_json({"error": f"'{path}' is not a file"})
 
         target.unlink()
 
         await _notify_write(path, "D")
-        return json.dumps({"success": True, "deleted": path})
+        return to_json({"success": True, "deleted": path})
 
     @mcp.tool()
     async def delete_folder(path: str) -> str:
@@ -438,25 +1012,26 @@ def register_crud_tools(mcp: FastMCP):
         Returns:
             Success or error message.
         """
-        repo_dir = _get_repo_dir()
+        repo_dir = get_repo_dir()
         try:
             target = safe_path(path, repo_dir)
         except PathValidationError as e:
-            return json.dumps({"error": str(e)})
+            return to_json({"error": str(e)})
 
-        if not target.exists():
-            return json.dumps({"error": f"Folder '{path}' not found"})
-        if not target.is_dir():
-            return json.dumps({"error": f"'{path}' is not a folder"})
+        st = _stat_or_none(target)
+        if st is None:
+            return to_json({"error": f"Folder '{path}' not found"})
+        if not stat.S_ISDIR(st.st_mode):
+            return to_json({"error": f"'{path}' is not a folder"})
 
         # Safety: don't delete the repo root
         if target.resolve() == repo_dir.resolve():
-            return json.dumps({"error": "Cannot delete the repository root"})
+            return to_json({"error": "Cannot delete the repository root"})
 
-        shutil.rmtree(str(target))
+        await asyncio.to_thread(shutil.rmtree, str(target))
 
-        await _notify_write(path, "D")
-        return json.dumps({"success": True, "deleted": path})
+        await _notify_folder_write(relative_to_repo(target, repo_dir))
+        return to_json({"success": True, "deleted": path})
 
     @mcp.tool()
     async def append_to_file(path: str, content: str) -> str:
@@ -469,21 +1044,19 @@ def register_crud_tools(mcp: FastMCP):
         Returns:
             Success with new file size, or error.
         """
-        repo_dir = _get_repo_dir()
+        repo_dir = get_repo_dir()
         try:
             target = safe_path(path, repo_dir)
         except PathValidationError as e:
-            return json.dumps({"error": str(e)})
-
-        if not target.exists() or not target.is_file():
-            return json.dumps({"error": f"File '{path}' not found"})
+            return to_json({"error": str(e)})
 
-        with open(target, "a", encoding="utf-8") as f:
-            f.write(content)
+        st = _stat_or_none(target)
+        if st is None or not stat.S_ISREG(st.st_mode):
+            return to_json({"error": f"File '{path}' not found"})
 
-        new_size = target.stat().st_size
+        new_size = await asyncio.to_thread(_append_text, target, content)
         await _notify_write(path, "M")
-        return json.dumps({
+        return to_json({
             "success": True,
             "path": path,
             "new_size": new_size,
@@ -495,35 +1068,35 @@ def register_crud_tools(mcp: FastMCP):
 
         Args:
             path: Relative path to the file.
-            position: Character position where content should be inserted (0-indexed).
+            position: Character position where content should be inserted
+                (0-indexed; a "\\r\\n" pair counts as one, as in read_range).
             content: Content to insert.
 
         Returns:
-            Success with new file size, or error.
+            Success with new file size in characters, or error.
         """
-        repo_dir = _get_repo_dir()
+        repo_dir = get_repo_dir()
         try:
             target = safe_path(path, repo_dir)
         except PathValidationError as e:
-            return json.dumps({"error": str(e)})
+            return to_json({"error": str(e)})
 
-        if not target.exists() or not target.is_file():
-            return json.dumps({"error": f"File '{path}' not found"})
+        st = _stat_or_none(target)
+        if st is None or not stat.S_ISREG(st.st_mode):
+            return to_json({"error": f"File '{path}' not found"})
 
         try:
-            existing = target.read_text(encoding="utf-8")
+            pos, new_size = await asyncio.to_thread(
+                _insert_text, target, max(0, position), content
+            )
         except UnicodeDecodeError:
-            return json.dumps({"error": "Binary file"})
-
-        pos = max(0, min(position, len(existing)))
-        new_content = existing[:pos] + content + existing[pos:]
-        target.write_text(new_content, encoding="utf-8")
+            return to_json({"error": "Binary file"})
 
         await _notify_write(path, "M")
-        return json.dumps({
+        return to_json({
             "success": True,
             "path": path,
             "position": pos,
             "inserted_length": len(content),
-            "new_size": len(new_content),
+            "new_size": new_size,
         })
@@ -1,20 +1,17 @@
 """Semantic search MCP tool — the 15th tool."""
 
-import json
+from collections.abc import Callable
 
 import structlog
 
 from mcp.server.fastmcp import FastMCP
 
-log = structlog.get_logger()
-
+from src.tools import to_json
 
-def _get_search_engine():
-    from src.main import search_engine
-    return search_engine
+log = structlog.get_logger()
 
 
-def register_search_tool(mcp: FastMCP):
+def register_search_tool(mcp: FastMCP, get_search_engine: Callable[[], object]):
     """Register the semantic_search tool on the given FastMCP server."""
 
     @mcp.tool()
@@ -35,15 +32,15 @@ def register_search_tool(mcp: FastMCP):
               - score: Relevance score 0.0-1.0
               - preview: Short text preview of the matching section
         """
-        engine = _get_search_engine()
+        engine = get_search_engine()
         if engine is None:
-            return json.dumps({"error": "Semantic search engine not initialised"})
+            return to_json({"error": "Semantic search engine not initialised"})
 
         top_k = max(1, min(top_k, 20))
 
         try:
             results = await engine.search(query, top_k=top_k)
-            return json.dumps(results, indent=2)
+            return to_json(results)
         except Exception as e:
             log.exception("semantic_search_tool_error", query=query)
-            return json.dumps({"error": f"Search failed: {str(e)}"})
+            return to_json({"error": f"Search failed: {str(e)}"})
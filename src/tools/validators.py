@@ -1,5 +1,6 @@
 """Path validation utilities to prevent directory traversal attacks."""
 
+from functools import lru_cache
 from pathlib import Path
 
 
@@ -8,6 +9,12 @@ class PathValidationError(Exception):
     pass
 
 
+@lru_cache(maxsize=8)
+def _resolved_base(base_dir: Path) -> Path:
+    """Resolve the repo root once per process (resolve() lstat()s each part)."""
+    return base_dir.resolve()
+
+
 def safe_path(path: str, base_dir: Path) -> Path:
     """Resolve a user-supplied path and ensure it stays within base_dir.
 
@@ -25,23 +32,16 @@ def safe_path(path: str, base_dir: Path) -> Path:
     clean = path.lstrip("/").lstrip("\\")
 
     # Resolve against base
+    # resolve() follows symlinks, so a link pointing outside the repo is
+    # caught by the same check
     resolved = (base_dir / clean).resolve()
-    base_resolved = base_dir.resolve()
 
-    # Ensure resolved path is within base
-    if not str(resolved).startswith(str(base_resolved)):
+    # Compare path components, not string prefixes (/repo2 is not in /repo)
+    if not resolved.is_relative_to(_resolved_base(base_dir)):
         raise PathValidationError(
             f"Path '{path}' resolves outside the repository root"
         )
 
-    # Reject symlinks that point outside base
-    if resolved.is_symlink():
-        real = resolved.resolve()
-        if not str(real).startswith(str(base_resolved)):
-            raise PathValidationError(
-                f"Symlink '{path}' points outside the repository root"
-            )
-
     return resolved
 
 
@@ -51,6 +51,7 @@ def relative_to_repo(absolute_path: Path, base_dir: Path) -> str:
     Always uses forward slashes for cross-platform compatibility.
     """
     try:
-        return str(absolute_path.relative_to(base_dir.resolve())).replace("\\", "/")
+        base_resolved = _resolved_base(base_dir)
+        return str(absolute_path.relative_to(base_resolved)).replace("\\", "/")
     except ValueError:
         return str(absolute_path).replace("\\", "/")
@@ -45,6 +45,21 @@ def test_safe_path_rejects_double_dot_escape():
             safe_path("../../etc/shadow", base_path)
 
 
+def test_safe_path_rejects_sibling_with_common_prefix(tmp_path):
+    # /tmp/x/repo2 shares a string prefix with /tmp/x/repo but is outside it
+    (tmp_path / "repo").mkdir()
+    with pytest.raises(PathValidationError):
+        safe_path("../repo2/secret.txt", tmp_path / "repo")
+
+
+def test_safe_path_rejects_symlink_escape(tmp_path):
+    (tmp_path / "repo").mkdir()
+    (tmp_path / "outside").mkdir()
+    (tmp_path / "repo" / "link").symlink_to(tmp_path / "outside")
+    with pytest.raises(PathValidationError):
+        safe_path("link/secret.txt", tmp_path / "repo")
+
+
 def test_safe_path_strips_leading_slash():
     with tempfile.TemporaryDirectory() as base:
         base_path = Path(base)
@@ -155,3 +170,231 @@ def test_list_folder(repo_dir):
 
     assert "subdir" in dirs
     assert "file.txt" in files
+
+
+@pytest.mark.asyncio
+async def test_search_files_skips_git_dir(repo_dir):
+    from src.tools.crud import _run_search, _search_command
+
+    (repo_dir / "notes").mkdir()
+    (repo_dir / "notes" / "a.md").write_text("intro\nCost is $5.00 (approx)\n")
+    (repo_dir / ".git").mkdir()
+    (repo_dir / ".git" / "config").write_text("Cost is $5.00 (approx)\n")
+
+    assert "-F" in _search_command("hello world", repo_dir, False)
+    assert "-F" not in _search_command("cost.*approx", repo_dir, False)
+
+    matches = await _run_search("cost is \\$5", repo_dir, repo_dir, False)
+    assert matches == [
+        {"file": "notes/a.md", "line": 2, "content": "Cost is $5.00 (approx)"}
+    ]
+    assert await _run_search("cost", repo_dir, repo_dir, False, ("txt",)) == []
+
+
+@pytest.mark.asyncio
+async def test_search_fallback_uses_extended_regex(repo_dir):
+    from src.tools.crud import SearchError, _run_search
+
+    (repo_dir / "a.py").write_text("x = 1\nprint(x)\n")
+
+    matches = await _run_search("prin(t|x)\\(", repo_dir, repo_dir, True)
+    assert [m["line"] for m in matches] == [2]
+    # An unbalanced group is an error in every backend, not "no matches"
+    with pytest.raises(SearchError):
+        await _run_search("print(", repo_dir, repo_dir, True)
+
+
+@pytest.mark.asyncio
+async def test_search_truncates_oversized_match_lines(repo_dir, monkeypatch):
+    from src.tools import crud
+
+    monkeypatch.setattr(crud, "SEARCH_LINE_LIMIT", 1024)
+    (repo_dir / "app.min.js").write_text("var needle=" + "x" * 5000 + "\n")
+    (repo_dir / "b.js").write_text("needle\n")
+
+    matches = await crud._run_search("needle", repo_dir, repo_dir, False)
+    assert sorted(m["file"] for m in matches) == ["app.min.js", "b.js"]
+    assert all(len(m["content"]) <= crud.SEARCH_MAX_LINE_CHARS for m in matches)
+
+
+@pytest.mark.asyncio
+async def test_search_files_uses_git_grep_in_clone(tmp_path):
+    import pygit2
+    from src.tools.crud import SearchError, _is_git_worktree, _run_search
+
+    repo = pygit2.init_repository(str(tmp_path))
+    (tmp_path / "tracked.md").write_text("needle one\n")
+    repo.index.add("tracked.md")
+    repo.index.write()
+    (tmp_path / "new note.md").write_text("x\nneedle two\n")
+    (tmp_path / ".gitignore").write_text("ignored.md\n")
+    (tmp_path / "ignored.md").write_text("needle three\n")
+
+    assert _is_git_worktree(tmp_path)
+    matches = await _run_search("NEEDLE", tmp_path, tmp_path, False)
+    assert sorted((m["file"], m["line"]) for m in matches) == [
+        ("new note.md", 2), ("tracked.md", 1)
+    ]
+    assert await _run_search("needle", tmp_path, tmp_path, False, ("txt",)) == []
+
+    # Same extended-regex dialect as the fallback backends
+    matches = await _run_search("needle (one|two)", tmp_path, tmp_path, True)
+    assert len(matches) == 2
+    with pytest.raises(SearchError):
+        await _run_search("needle (", tmp_path, tmp_path, True)
+
+
+def test_parse_rg_json_match():
+    from src.tools.crud import _parse_rg_line
+
+    line = json.dumps({"type": "match", "data": {
+        "path": {"text": "/repo/a.md"}, "lines": {"text": "hit\n"},
+        "line_number": 7, "absolute_offset": 0, "submatches": [],
+    }}).encode()
+    assert _parse_rg_line(line) == ("/repo/a.md", 7, "hit\n")
+    assert _parse_rg_line(b'{"type": "begin", "data": {}}') is None
+
+
+def test_read_char_range_spans_blocks(repo_dir, monkeypatch):
+    import src.tools.crud as crud
+
+    monkeypatch.setattr(crud, "READ_BLOCK_CHARS", 4)
+    path = repo_dir / "range_me.txt"
+    content = "0123456789äbcdéfghij"
+    path.write_text(content, encoding="utf-8")
+
+    assert crud._read_char_range(path, 5, 15) == (content[5:15], len(content))
+    assert crud._read_char_range(path, 18, 99) == ("ij", len(content))
+
+    path.write_bytes(b"ab\r\ncd\r\n")
+    assert crud._read_char_range(path, 2, 4) == ("\nc", 6)
+
+
+def test_scan_files_prunes_git(repo_dir):
+    from src.tools.crud import _scan_files
+
+    (repo_dir / ".git" / "objects").mkdir(parents=True)
+    (repo_dir / ".git" / "objects" / "ab").write_text("x")
+    (repo_dir / "a").mkdir()
+    (repo_dir / "a" / "x.md").write_text("xx")
+    (repo_dir / "a-b.md").write_text("y")
+
+    paths = [f["path"] for f in _scan_files(repo_dir, repo_dir, recursive=True)]
+    assert paths == ["a/x.md", "a-b.md"]
+    assert [f["path"] for f in _scan_files(repo_dir, repo_dir, recursive=False)] == ["a-b.md"]
+
+    (repo_dir / "node_modules").mkdir()
+    (repo_dir / "node_modules" / "pkg.js").write_text("z")
+    assert "node_modules/pkg.js" not in [
+        f["path"] for f in _scan_files(repo_dir, repo_dir, recursive=True)
+    ]
+
+
+def test_insert_text_splices_bytes(repo_dir, monkeypatch):
+    import src.tools.crud as crud
+
+    monkeypatch.setattr(crud, "READ_BLOCK_BYTES", 3)
+    path = repo_dir / "insert_me.txt"
+    path.write_bytes("héllo\r\nwörld".encode())
+
+    # "\r\n" counts as one character, as in read_range
+    assert crud._insert_text(path, 6, "big ") == (6, 15)
+    assert path.read_bytes().decode() == "héllo\r\nbig wörld"
+    assert crud._insert_text(path, 5, "!") == (5, 16)
+    assert path.read_bytes().decode() == "héllo!\r\nbig wörld"
+    assert crud._insert_text(path, 99, "!") == (16, 17)
+    assert path.read_bytes().decode().endswith("wörld!")
+    assert crud._read_char_range(path, 0, 99) == ("héllo!\nbig wörld!", 17)
+    # A "\r\n" formed across the insertion point is one character too
+    path.write_bytes(b"a\r")
+    assert crud._insert_text(path, 2, "\nb") == (2, 3)
+    assert [p.name for p in repo_dir.iterdir()] == ["insert_me.txt"]
+
+
+def test_listing_cache_validates_mtime(repo_dir):
+    import os
+    import time
+    from src.tools import crud
+
+    crud.invalidate_listing_cache()
+    (repo_dir / "a.md").write_text("abc")
+    files = [{"name": "a.md", "path": "a.md", "size": 3}]
+    old = time.time_ns() - 10 * 1_000_000_000
+    key = ("folder", str(repo_dir))
+    crud._cache_listing(key, old, "[1]", files)
+    listing, sizes = crud._get_cached_listing(key, old)
+    assert listing == "[1]"
+    assert crud._sizes_unchanged(key[1], sizes)
+    assert crud._get_cached_listing(key, old + 1) is None
+
+    # An in-place edit keeps the dir mtime but must not serve a stale size
+    (repo_dir / "a.md").write_text("abcdef")
+    assert not crud._sizes_unchanged(key[1], sizes)
+    os.unlink(repo_dir / "a.md")
+    assert not crud._sizes_unchanged(key[1], sizes)
+
+    # Just-modified directories are not cached (racy mtime)
+    fresh = time.time_ns()
+    crud._cache_listing(("folder", "/s"), fresh, "[2]", [])
+    assert crud._get_cached_listing(("folder", "/s"), fresh) is None
+    crud.invalidate_listing_cache()
+
+
+@pytest.mark.asyncio
+async def test_list_folder_reports_size_after_in_place_edit(repo_dir):
+    import os
+    from mcp.server.fastmcp import FastMCP
+    from src.tools import crud
+
+    crud.invalidate_listing_cache()
+    (repo_dir / "a.md").write_text("abc")
+    old = 1_000_000_000_000_000_000
+    os.utime(repo_dir, ns=(old, old))
+
+    mcp = FastMCP("test")
+    crud.register_crud_tools(
+        mcp,
+        get_repo_dir=lambda: repo_dir,
+        get_debouncer=lambda: None,
+        get_search_engine=lambda: None,
+    )
+
+    async def sizes():
+        content, _ = await mcp.call_tool("list_folder", {"path": ""})
+        return [f["size"] for f in json.loads(content[0].text)["files"]]
+
+    assert await sizes() == [3]
+    (repo_dir / "a.md").write_text("abcdef")
+    os.utime(repo_dir, ns=(old, old))
+    assert await sizes() == [6]
+    crud.invalidate_listing_cache()
+
+
+@pytest.mark.asyncio
+async def test_crud_tools_use_injected_components(repo_dir):
+    from mcp.server.fastmcp import FastMCP
+    from src.tools.crud import register_crud_tools
+
+    class Recorder:
+        def __init__(self):
+            self.calls = []
+
+        async def notify_write(self, path):
+            self.calls.append(path)
+
+        async def on_file_changed(self, path, change_type):
+            self.calls.append((path, change_type))
+
+    deb, se = Recorder(), Recorder()
+    mcp = FastMCP("test")
+    register_crud_tools(
+        mcp,
+        get_repo_dir=lambda: repo_dir,
+        get_debouncer=lambda: deb,
+        get_search_engine=lambda: se,
+    )
+
+    await mcp.call_tool("add_file", {"path": "a.md", "content": "hi"})
+    assert (repo_dir / "a.md").read_text() == "hi"
+    assert deb.calls == ["a.md"]
+    assert se.calls == [("a.md", "A")]
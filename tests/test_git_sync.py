@@ -1,45 +1,72 @@
 """Tests for Git Sync Manager — uses a local bare repo as remote."""
 
-import os
-import tempfile
 from pathlib import Path
 
 import pytest
 
-# Skip git-dependent tests if GitPython/git binary are unavailable
-git = pytest.importorskip("git", reason="GitPython / git binary not available")
-Repo = git.Repo
+# Skip git-dependent tests if pygit2 is unavailable
+pygit2 = pytest.importorskip("pygit2", reason="pygit2 not available")
+
+SIGNATURE = pygit2.Signature("Test", "t@t.com")
 
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
+def commit_file(repo, name: str, content: str, message: str) -> str:
+    """Write a file into a working copy, commit it, and return the sha."""
+    (Path(repo.workdir) / name).write_text(content)
+    repo.index.add(name)
+    repo.index.write()
+    tree = repo.index.write_tree()
+    parents = [] if repo.head_is_unborn else [repo.head.target]
+    oid = repo.create_commit(
+        "HEAD", SIGNATURE, SIGNATURE, message, tree, parents
+    )
+    return str(oid)
+
+
 def create_test_repo(tmp_path: Path) -> tuple[Path, Path]:
     """Create a bare 'remote' and a local clone for testing.
 
     Returns (bare_repo_path, local_clone_path).
     """
     bare_path = tmp_path / "remote.git"
-    bare_path.mkdir()
-    bare_repo = Repo.init(str(bare_path), bare=True)
+    pygit2.init_repository(str(bare_path), bare=True, initial_head="main")
 
     # Create a working copy to seed the bare repo
     seed_path = tmp_path / "seed"
-    seed_repo = Repo.clone_from(str(bare_path), str(seed_path))
-    seed_repo.config_writer().set_value("user", "name", "Test").release()
-    seed_repo.config_writer().set_value("user", "email", "t@t.com").release()
+    seed_repo = pygit2.init_repository(str(seed_path), initial_head="main")
+    seed_repo.remotes.create("origin", str(bare_path))
 
     # Add an initial commit
-    readme = seed_path / "README.md"
-    readme.write_text("# Test Repo\n")
-    seed_repo.index.add(["README.md"])
-    seed_repo.index.commit("Initial commit")
-    seed_repo.remotes.origin.push(refspec="HEAD:refs/heads/main")
+    commit_file(seed_repo, "README.md", "# Test Repo\n", "Initial commit")
+    seed_repo.remotes["origin"].push(["refs/heads/main"])
 
     return bare_path, seed_path
 
 
+def make_manager(bare_path: Path, clone_path: Path):
+    """Build an initialised GitSyncManager cloning from bare_path."""
+    from src.config import Settings
+    from src.git_sync.manager import GitSyncManager
+
+    settings = Settings(
+        github_repo_url=str(bare_path),
+        github_token="unused",
+        github_branch="main",
+        oauth_client_id="c",
+        oauth_client_secret="s",
+        oauth_issuer_url="https://example.com",
+        jwt_secret_key="k",
+        repo_dir=str(clone_path),
+    )
+    manager = GitSyncManager(settings)
+    manager._init_sync()
+    return manager
+
+
 # ---------------------------------------------------------------------------
 # Debouncer tests (unit — no real git)
 # ---------------------------------------------------------------------------
@@ -48,7 +75,7 @@ class MockGitManager:
     """Minimal mock for PushDebouncer tests."""
     pushes: list[str] = []
 
-    async def push(self, message: str) -> bool:
+    async def push(self, message: str, paths=None) -> bool:
         self.pushes.append(message)
         return True
 
@@ -108,41 +135,165 @@ async def test_debouncer_force_push():
     assert len(mock.pushes) == 1
 
 
+@pytest.mark.asyncio
+async def test_debouncer_max_wait_caps_delay():
+    """Once max_wait has elapsed, a write should push without debouncing."""
+    import asyncio
+    from src.git_sync.debouncer import PushDebouncer
+
+    mock = MockGitManager()
+    mock.pushes = []
+    d = PushDebouncer(mock, delay=9999, max_wait=0)
+
+    await d.notify_write("busy.txt")
+    await asyncio.sleep(0.05)
+
+    assert len(mock.pushes) == 1
+
+
+class FailingGitManager(MockGitManager):
+    """Mock whose pushes always fail (e.g. the remote is unreachable)."""
+
+    async def push(self, message: str, paths=None) -> bool:
+        self.pushes.append(message)
+        return False
+
+
+@pytest.mark.asyncio
+async def test_debouncer_failed_push_waits_before_retrying():
+    """After a failed push past max_wait, the next write debounces again."""
+    import asyncio
+    from src.git_sync.debouncer import PushDebouncer
+
+    mock = FailingGitManager()
+    mock.pushes = []
+    d = PushDebouncer(mock, delay=60, max_wait=60)
+
+    await d.notify_write("a.txt")
+    d._first_write_mono -= 100  # the write has been pending past max_wait
+    d._timer_handle.cancel()
+    await d._do_push(scoped=True)
+    assert len(mock.pushes) == 1
+    assert d.has_pending
+
+    await d.notify_write("b.txt")
+    await asyncio.sleep(0.05)
+    assert len(mock.pushes) == 1
+    assert d._timer_handle.when() - asyncio.get_running_loop().time() > 30
+    d._timer_handle.cancel()
+
+
 # ---------------------------------------------------------------------------
 # Change detection tests
 # ---------------------------------------------------------------------------
 
-@pytest.mark.skipif(
-    not __import__("shutil").which("git"),
-    reason="git binary not available in PATH",
-)
 def test_get_changes_detects_added_file(tmp_path):
     """GitSyncManager._get_changes should detect newly added files."""
-    bare_path, clone_path = create_test_repo(tmp_path)
-    repo = Repo(str(clone_path))
-    repo.config_writer().set_value("user", "name", "Test").release()
-    repo.config_writer().set_value("user", "email", "t@t.com").release()
-
-    old_sha = repo.head.commit.hexsha
-
-    # Add a new file
-    new_file = clone_path / "new_feature.py"
-    new_file.write_text("def hello(): pass\n")
-    repo.index.add(["new_feature.py"])
-    repo.index.commit("Add new_feature.py")
-
-    new_sha = repo.head.commit.hexsha
-
-    # Use the manager's change detection logic
-    diff_output = repo.git.diff("--name-status", old_sha, new_sha)
-    changes = []
-    for line in diff_output.strip().split("\n"):
-        if line.strip():
-            parts = line.split("\t")
-            if len(parts) >= 2:
-                changes.append((parts[-1], parts[0][0]))
+    bare_path, _ = create_test_repo(tmp_path)
+    manager = make_manager(bare_path, tmp_path / "clone")
+    repo = manager.repo
+
+    old_sha = str(repo.head.target)
+    new_sha = commit_file(repo, "new_feature.py", "def hello(): pass\n", "Add")
+
+    changes = manager._get_changes(old_sha, new_sha)
 
     files = [c[0] for c in changes]
     types = [c[1] for c in changes]
     assert "new_feature.py" in files
     assert "A" in types
+
+
+def test_pull_fast_forwards_and_reports_changes(tmp_path):
+    """_pull_sync should fast-forward to the remote and list changed files."""
+    bare_path, seed_path = create_test_repo(tmp_path)
+    manager = make_manager(bare_path, tmp_path / "clone")
+
+    seed_repo = pygit2.Repository(str(seed_path))
+    commit_file(seed_repo, "notes.md", "remote edit\n", "Remote commit")
+    seed_repo.remotes["origin"].push(["refs/heads/main"])
+
+    changes = manager._pull_sync()
+
+    assert ("notes.md", "A") in changes
+    assert (tmp_path / "clone" / "notes.md").read_text() == "remote edit\n"
+
+
+def test_advertised_oid_reads_remote_tip(tmp_path):
+    """_advertised_oid should return the bare remote's branch tip."""
+    bare_path, seed_path = create_test_repo(tmp_path)
+    manager = make_manager(bare_path, tmp_path / "clone")
+    remote = manager.repo.remotes["origin"]
+
+    seed_repo = pygit2.Repository(str(seed_path))
+    new_sha = commit_file(seed_repo, "tip.md", "tip\n", "Advance remote")
+    seed_repo.remotes["origin"].push(["refs/heads/main"])
+
+    assert str(manager._advertised_oid(remote)) == new_sha
+    assert ("tip.md", "A") in manager._pull_sync()
+    assert manager._advertised_oid(remote) == manager.repo.head.target
+
+
+def test_pull_skips_fetch_when_remote_unchanged(tmp_path, monkeypatch):
+    """An idle remote should be detected from its advertised refs alone."""
+    bare_path, _ = create_test_repo(tmp_path)
+    manager = make_manager(bare_path, tmp_path / "clone")
+
+    def fail_fetch(*args, **kwargs):
+        raise AssertionError("fetch should not run when remote is unchanged")
+
+    monkeypatch.setattr(pygit2.Remote, "fetch", fail_fetch)
+    assert manager._pull_sync() == []
+
+
+def test_push_commits_and_pushes_local_writes(tmp_path):
+    """_push_sync should commit working-tree changes and update the remote."""
+    bare_path, _ = create_test_repo(tmp_path)
+    manager = make_manager(bare_path, tmp_path / "clone")
+
+    (tmp_path / "clone" / "local.txt").write_text("written by MCP\n")
+    assert manager._push_sync("MCP: Update 1 file(s)") is True
+
+    bare = pygit2.Repository(str(bare_path))
+    head = bare.get(bare.references["refs/heads/main"].target)
+    assert head.message == "MCP: Update 1 file(s)"
+    assert "local.txt" in head.tree
+    assert manager._status_sync()["dirty"] is False
+
+
+def test_push_checks_only_notified_paths(tmp_path):
+    """A scoped push stages the listed files, and a folder falls back to a full scan."""
+    bare_path, _ = create_test_repo(tmp_path)
+    clone = tmp_path / "clone"
+    manager = make_manager(bare_path, clone)
+
+    (clone / "a.txt").write_text("a\n")
+    (clone / "b.txt").write_text("b\n")
+    assert manager._status_of(["a.txt"]) == {"a.txt": pygit2.GIT_STATUS_WT_NEW}
+    assert manager._push_sync("scoped", ["a.txt"]) is True
+    assert manager.repo.status() == {"b.txt": pygit2.GIT_STATUS_WT_NEW}
+
+    (clone / "notes").mkdir()
+    (clone / "notes" / "c.txt").write_text("c\n")
+    assert manager._status_of(["notes"]) is None
+    assert manager._push_sync("folder", ["notes"]) is True
+    assert manager._status_sync()["dirty"] is False
+
+
+def test_push_skips_ignored_paths(tmp_path):
+    """A write to a .gitignored file makes no commit."""
+    bare_path, _ = create_test_repo(tmp_path)
+    clone = tmp_path / "clone"
+    manager = make_manager(bare_path, clone)
+    (clone / ".gitignore").write_text("scratch.txt\n")
+    assert manager._push_sync("ignore", [".gitignore"]) is True
+    head = manager.repo.head.target
+
+    (clone / "scratch.txt").write_text("x\n")
+    assert manager._status_of(["scratch.txt"]) == {}
+    assert manager._push_sync("ignored", ["scratch.txt"]) is True
+    assert manager.repo.head.target == head
+
+    # A status entry that stages nothing doesn't commit either
+    assert manager._commit_all("empty", {"scratch.txt": pygit2.GIT_STATUS_IGNORED}) is None
+    assert manager.repo.head.target == head
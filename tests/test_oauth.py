@@ -59,12 +59,38 @@ def test_refresh_token_unknown(tm):
     assert result is None
 
 
+def test_refresh_token_store_is_bounded(tm, monkeypatch):
+    monkeypatch.setattr("src.oauth.tokens.MAX_REFRESH_TOKENS", 2)
+    oldest = tm.create_refresh_token("client")
+    tm.create_refresh_token("client")
+    newest = tm.create_refresh_token("client")
+    assert tm.use_refresh_token(oldest) is None
+    assert tm.use_refresh_token(newest) == "client"
+
+
 def test_access_token_scopes(tm):
     token = tm.create_access_token("client", scopes=["mcp", "read"])
     claims = tm.verify_access_token(token)
     assert claims["scopes"] == ["mcp", "read"]
 
 
+def test_verify_reuses_cached_payload(tm, monkeypatch):
+    token = tm.create_access_token("client")
+    claims = tm.verify_access_token(token)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("cached token was decoded again")
+
+    monkeypatch.setattr(tm._jwt, "decode", fail)
+    assert tm.verify_access_token(token) == claims
+
+    # Callers get copies: mutating one doesn't reach the cache
+    claims["sub"] = "mallory"
+    claims["scopes"].append("admin")
+    assert tm.verify_access_token(token)["sub"] == "client"
+    assert "admin" not in tm.verify_access_token(token)["scopes"]
+
+
 # ---------------------------------------------------------------------------
 # PKCE tests (testing the helper function directly)
 # ---------------------------------------------------------------------------
@@ -94,3 +120,57 @@ def test_pkce_verify_tampered_challenge():
     verifier, challenge = _make_pkce_pair()
     tampered = challenge[:-4] + "AAAA"
     assert _verify_pkce(verifier, tampered) is False
+
+
+# ---------------------------------------------------------------------------
+# Middleware tests (ASGI, against a stub downstream app)
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def protected_client():
+    from types import SimpleNamespace
+
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+    from starlette.testclient import TestClient
+
+    from src.oauth.middleware import OAuthMiddleware
+
+    async def echo(request):
+        claims = getattr(request.state, "oauth_claims", None)
+        return JSONResponse({"sub": claims["sub"] if claims else None})
+
+    app = Starlette(routes=[
+        Route("/health", echo),
+        Route("/mcp/", echo),
+    ])
+    settings = SimpleNamespace(
+        jwt_secret_key="test-secret-key-32-bytes-long!!",
+        oauth_issuer_url="https://example.com/",
+    )
+    app.add_middleware(OAuthMiddleware, settings=settings)
+    return TestClient(app)
+
+
+def test_middleware_public_path_passes(protected_client):
+    assert protected_client.get("/health").status_code == 200
+
+
+def test_middleware_rejects_missing_token(protected_client):
+    resp = protected_client.get("/mcp/")
+    assert resp.status_code == 401
+    assert resp.json()["error"] == "unauthorized"
+    assert resp.headers["WWW-Authenticate"].startswith(
+        'Bearer realm="https://example.com", error="invalid_token"'
+    )
+
+
+def test_middleware_accepts_valid_token(protected_client):
+    tm = TokenManager("test-secret-key-32-bytes-long!!", "https://example.com/")
+    token = tm.create_access_token("client-xyz")
+    resp = protected_client.get(
+        "/mcp/", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert resp.status_code == 200
+    assert resp.json() == {"sub": "client-xyz"}
@@ -1,5 +1,6 @@
 """Tests for the semantic search components (chunker, FAISS index)."""
 
+import asyncio
 import tempfile
 from pathlib import Path
 
@@ -54,6 +55,16 @@ def test_chunk_file_whitespace_only():
     assert chunks == []
 
 
+def test_chunk_file_skips_blank_chunks():
+    chunker = FileChunker(chunk_size=100, overlap=20)
+    content = "a" * 50 + " " * 400 + "b" * 50
+    chunks = chunker.chunk_file("gap.txt", content)
+
+    assert chunks[0].char_start == 0
+    assert chunks[-1].char_end == len(content)
+    assert not any(c.text.isspace() for c in chunks)
+
+
 def test_chunk_file_positions_contiguous():
     """Chunk positions should cover the entire file (with overlaps)."""
     chunker = FileChunker(chunk_size=100, overlap=20)
@@ -76,6 +87,14 @@ def test_chunk_preview():
         assert len(chunk.preview) <= 200
 
 
+def test_decode_text_translates_line_endings():
+    from src.semantic.chunker import decode_text
+
+    # Offsets match a text-mode read: "\r\n" and "\r" are one "\n"
+    assert decode_text(b"a\r\nb\rc\n") == "a\nb\nc\n"
+    assert decode_text("é\r\nx".encode()) == "é\nx"
+
+
 def test_is_indexable_python():
     chunker = FileChunker()
     assert chunker.is_indexable(Path("src/main.py"))
@@ -117,6 +136,17 @@ def test_chunk_directory(tmp_path):
     assert not any("image.png" in c.file_path for c in all_chunks)
 
 
+def test_chunk_directory_sorted_order(tmp_path):
+    for rel in ["b.md", "a/z.md", "a-b.md", "a/c/d.md", "A.md"]:
+        (tmp_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel).write_text("text " + rel)
+
+    chunker = FileChunker()
+    paths = [c.file_path for c in chunker.chunk_directory(tmp_path)]
+    assert paths == sorted(paths)
+    assert paths == ["A.md", "a-b.md", "a/c/d.md", "a/z.md", "b.md"]
+
+
 # ---------------------------------------------------------------------------
 # FAISS index tests (no model — uses random vectors)
 # Skipped automatically if faiss-cpu is not installed.
@@ -199,6 +229,152 @@ def test_faiss_save_and_load(index_dir):
     assert idx2.get_file_hash("saved.py") == "abc123"
 
 
+def test_faiss_load_rejects_interrupted_save(index_dir, monkeypatch):
+    import faiss
+    from src.semantic.faiss_index import FAISSIndex, EMBEDDING_DIM
+    from src.semantic.chunker import Chunk
+
+    idx = FAISSIndex(index_dir)
+    vectors = np.random.randn(2, EMBEDDING_DIM).astype(np.float32)
+    idx.add([Chunk(id=1, file_path="a.py", char_start=0, char_end=5, text="x")], vectors[:1])
+    idx.save()
+
+    # Crash after the metadata is replaced but before the index is
+    idx.add([Chunk(id=2, file_path="b.py", char_start=0, char_end=5, text="y")], vectors[1:])
+
+    def crash(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(faiss, "write_index", crash)
+    with pytest.raises(OSError):
+        idx.save()
+
+    idx2 = FAISSIndex(index_dir)
+    assert not idx2.load()
+    assert idx2.total_vectors == 0
+
+
+def test_faiss_mmap_load_copies_on_first_update(index_dir):
+    from src.semantic.faiss_index import FAISSIndex, EMBEDDING_DIM
+    from src.semantic.chunker import Chunk
+
+    idx = FAISSIndex(index_dir)
+    vectors = np.random.randn(2, EMBEDDING_DIM).astype(np.float32)
+    idx.add([
+        Chunk(id=3100, file_path="a.py", char_start=0, char_end=5, text="a"),
+        Chunk(id=3101, file_path="b.py", char_start=0, char_end=5, text="b"),
+    ], vectors)
+    idx.save()
+
+    idx2 = FAISSIndex(index_dir, memory_mappable=True)
+    assert idx2.load()
+    assert idx2._mapped
+    assert idx2.search(vectors[:1].copy(), top_k=1)[0]["file_path"] == "a.py"
+
+    # Resizing a mapped index would abort the process
+    idx2.remove_file("a.py")
+    idx2.add([Chunk(id=3102, file_path="c.py", char_start=0, char_end=5, text="c")],
+             np.random.randn(1, EMBEDDING_DIM).astype(np.float32))
+    assert not idx2._mapped
+    assert idx2.total_vectors == 2
+
+
+def test_faiss_mmap_unsupported_falls_back_to_plain_read(index_dir, monkeypatch):
+    from src.semantic.faiss_index import FAISSIndex, EMBEDDING_DIM
+    from src.semantic.chunker import Chunk
+
+    idx = FAISSIndex(index_dir)
+    idx.add([Chunk(id=3200, file_path="a.py", char_start=0, char_end=5, text="a")],
+            np.random.randn(1, EMBEDDING_DIM).astype(np.float32))
+    idx.set_file_hash("a.py", "h")
+    idx.save()
+
+    # Older FAISS wheels don't have the flag: not a reason to drop the index
+    monkeypatch.delattr(faiss, "IO_FLAG_MMAP_IFC")
+    idx2 = FAISSIndex(index_dir, memory_mappable=True)
+    assert idx2.load()
+    assert not idx2._mapped
+    assert idx2.total_vectors == 1
+    assert idx2.get_file_hash("a.py") == "h"
+
+
+def test_faiss_loads_legacy_chunk_meta(index_dir):
+    import orjson
+    from src.semantic.faiss_index import CHUNK_META_FILENAME, FAISSIndex, EMBEDDING_DIM
+    from src.semantic.chunker import Chunk
+
+    idx = FAISSIndex(index_dir)
+    vector = np.random.randn(1, EMBEDDING_DIM).astype(np.float32)
+    idx.add([Chunk(id=5000, file_path="old.md", char_start=0, char_end=9, text="x")], vector)
+    idx.save()
+    legacy = {"5000": {"file_path": "old.md", "char_start": 0, "char_end": 9}}
+    (index_dir / CHUNK_META_FILENAME).write_bytes(orjson.dumps(legacy))
+
+    idx2 = FAISSIndex(index_dir)
+    assert idx2.load()
+    [result] = idx2.search(vector, top_k=1)
+    assert result["file_path"] == "old.md"
+    assert result["text"] is None
+    idx2.remove_file("old.md")
+    assert idx2.total_vectors == 0
+
+
+def test_faiss_save_writes_only_dirty_files(index_dir):
+    from src.semantic.faiss_index import (
+        FAISSIndex, EMBEDDING_DIM, FILE_HASHES_FILENAME, INDEX_FILENAME,
+    )
+    from src.semantic.chunker import Chunk
+
+    idx = FAISSIndex(index_dir)
+    chunks = [Chunk(id=4000, file_path="a.py", char_start=0, char_end=1, text="x")]
+    idx.add(chunks, np.random.randn(1, EMBEDDING_DIM).astype(np.float32))
+    idx.save()
+    index_mtime = (index_dir / INDEX_FILENAME).stat().st_mtime_ns
+
+    idx.set_file_hash("a.py", "abc123")
+    idx.save()
+
+    assert (index_dir / INDEX_FILENAME).stat().st_mtime_ns == index_mtime
+    assert (index_dir / FILE_HASHES_FILENAME).exists()
+    assert not list(index_dir.glob("*.tmp"))
+
+
+def test_faiss_converts_to_ivf_pq(index_dir, monkeypatch):
+    import src.semantic.faiss_index as faiss_index
+    from src.semantic.chunker import Chunk
+
+    # Tiny layout so training stays fast on 500 vectors
+    monkeypatch.setattr(faiss_index, "IVF_PQ_FACTORY", "IVF4,PQ8x4")
+    monkeypatch.setattr(faiss_index, "IVF_MIN_VECTORS", 400)
+    idx = faiss_index.FAISSIndex(index_dir, nprobe=4)
+
+    def batch(start, n):
+        chunks = [
+            Chunk(id=i, file_path=f"f{i % 50}.md", char_start=0, char_end=1, text="x")
+            for i in range(start, start + n)
+        ]
+        vectors = np.random.randn(n, faiss_index.EMBEDDING_DIM).astype(np.float32)
+        return chunks, vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    idx.add(*batch(0, 300))
+    assert isinstance(idx._index, faiss.IndexIDMap)
+    chunks, vectors = batch(300, 200)
+    idx.add(chunks, vectors)
+    assert isinstance(idx._index, faiss.IndexIVFPQ)
+    assert idx._index.nprobe == 4
+    assert idx.total_vectors == 500
+
+    idx.remove_file("f0.md")
+    assert idx.total_vectors == 490
+
+    idx.save()
+    idx2 = faiss_index.FAISSIndex(index_dir, nprobe=4)
+    assert idx2.load()
+    assert idx2._index.nprobe == 4
+    results = idx2.search(vectors[:1], top_k=5)
+    assert results and all(r["chunk_id"] >= 0 for r in results)
+
+
 def test_faiss_empty_search(index_dir):
     from src.semantic.faiss_index import FAISSIndex, EMBEDDING_DIM
 
@@ -206,3 +382,233 @@ def test_faiss_empty_search(index_dir):
     query = np.random.randn(1, EMBEDDING_DIM).astype(np.float32)
     results = idx.search(query, top_k=10)
     assert results == []
+
+
+# ---------------------------------------------------------------------------
+# Engine incremental-update tests (stub embedder — no model download)
+# ---------------------------------------------------------------------------
+
+class StubEmbedder:
+    """Records embed calls and returns random unit vectors."""
+
+    def __init__(self):
+        self.calls: list[int] = []
+
+    async def embed_documents(self, texts, batch_size: int = 32):
+        from src.semantic.faiss_index import EMBEDDING_DIM
+
+        self.calls.append(len(texts))
+        vectors = np.random.randn(len(texts), EMBEDDING_DIM).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    async def embed_query(self, query):
+        return (await self.embed_documents([query]))[:1]
+
+
+class StubReranker:
+    """Keeps FAISS order, scoring every candidate 1.0."""
+
+    async def rerank(self, query, candidates, top_k=10):
+        return [(c, 1.0) for c in candidates[:top_k]]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    from types import SimpleNamespace
+    from src.semantic.engine import SemanticSearchEngine
+
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    settings = SimpleNamespace(
+        repo_path=repo, index_path=tmp_path / "index", faiss_nprobe=8,
+        faiss_mmap=False,
+    )
+    eng = SemanticSearchEngine(settings)
+    eng._embedder = StubEmbedder()
+    return eng
+
+
+@pytest.mark.asyncio
+async def test_on_files_changed_embeds_batch_once(engine):
+    repo = engine._repo_path
+    (repo / "a.md").write_text("alpha " * 50)
+    (repo / "b.py").write_text("print('beta')\n" * 20)
+    (repo / "c.png").write_bytes(b"\x89PNG")
+
+    await engine.on_files_changed([("a.md", "A"), ("b.py", "A"), ("c.png", "A")])
+
+    assert len(engine._embedder.calls) == 1
+    assert engine._faiss.get_file_hash("a.md") is not None
+    assert engine._faiss.get_file_hash("b.py") is not None
+    assert engine._faiss.get_file_hash("c.png") is None
+
+
+@pytest.mark.asyncio
+async def test_on_files_changed_skips_unchanged_and_removes_deleted(engine):
+    repo = engine._repo_path
+    (repo / "a.md").write_text("alpha " * 50)
+    (repo / "b.md").write_text("beta " * 50)
+    await engine.on_files_changed([("a.md", "A"), ("b.md", "A")])
+    before = engine._faiss.total_vectors
+
+    (repo / "b.md").unlink()
+    await engine.on_files_changed([("a.md", "M"), ("b.md", "D")])
+
+    assert len(engine._embedder.calls) == 1  # a.md unchanged → no re-embed
+    assert engine._faiss.get_file_hash("b.md") is None
+    assert engine._faiss.total_vectors < before
+
+
+@pytest.mark.asyncio
+async def test_full_build_pipelines_batches(engine, monkeypatch):
+    import src.semantic.engine as engine_mod
+
+    monkeypatch.setattr(engine_mod, "BUILD_BATCH_SIZE", 2)
+    repo = engine._repo_path
+    for name in ("a.md", "b.md", "c.md"):
+        (repo / name).write_text(f"{name} " * 40)
+
+    await engine._build_full_index()
+
+    assert engine._embedder.calls == [2, 1]
+    assert engine._faiss.total_vectors == 3
+    assert all(engine._faiss.get_file_hash(n) for n in ("a.md", "b.md", "c.md"))
+
+
+@pytest.mark.asyncio
+async def test_on_file_changed_coalesces_into_one_batch(engine):
+    repo = engine._repo_path
+    (repo / "a.md").write_text("alpha " * 50)
+    (repo / "b.md").write_text("beta " * 50)
+
+    await engine.on_file_changed("a.md", "A")
+    await engine.on_file_changed("b.md", "A")
+    await engine.on_file_changed("a.md", "M")
+    assert engine._embedder.calls == []  # queued, not yet applied
+
+    await engine.close()
+
+    assert len(engine._embedder.calls) == 1
+    assert engine._faiss.get_file_hash("a.md") is not None
+    assert engine._faiss.get_file_hash("b.md") is not None
+
+
+@pytest.mark.asyncio
+async def test_on_folder_changed_expands_indexed_files(engine):
+    repo = engine._repo_path
+    (repo / "notes").mkdir()
+    (repo / "notes" / "a.md").write_text("alpha " * 50)
+    (repo / "notes-old.md").write_text("beta " * 50)
+    await engine.on_files_changed([("notes/a.md", "A"), ("notes-old.md", "A")])
+
+    (repo / "notes").rename(repo / "archive")
+    await engine.on_folder_changed("notes", "archive")
+    await engine.close()
+
+    assert engine._faiss.get_file_hash("notes/a.md") is None
+    assert engine._faiss.get_file_hash("archive/a.md") is not None
+    assert engine._faiss.get_file_hash("notes-old.md") is not None
+
+
+@pytest.mark.asyncio
+async def test_search_uses_stored_chunk_text(engine):
+    repo = engine._repo_path
+    (repo / "a.md").write_text("alpha " * 50)
+    await engine.on_files_changed([("a.md", "A")])
+    engine._reranker = StubReranker()
+
+    # The file is gone from disk, but its chunk text lives in the index
+    (repo / "a.md").unlink()
+    results = await engine.search("alpha", top_k=5)
+
+    assert [r["file_name"] for r in results] == ["a.md"]
+    assert results[0]["preview"].startswith("alpha alpha")
+
+
+@pytest.mark.asyncio
+async def test_search_slices_legacy_chunks_in_text_mode(engine):
+    repo = engine._repo_path
+    (repo / "a.md").write_bytes(b"line one\r\n" * 30 + b"alpha tail")
+    await engine.on_files_changed([("a.md", "A")])
+    engine._reranker = StubReranker()
+
+    # Drop the stored text, as in an index saved before text was kept
+    meta = engine._faiss._chunk_meta
+    for chunk_id, m in meta.items():
+        meta[chunk_id] = m._replace(text=None)
+    results = await engine.search("alpha", top_k=5)
+
+    text = (repo / "a.md").read_text()
+    assert results
+    for r in results:
+        start, end = map(int, r["position_range"].split("-"))
+        assert r["preview"] == text[start:end][:200].replace("\n", " ").strip()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_searches_share_one_faiss_call(engine):
+    repo = engine._repo_path
+    (repo / "a.md").write_text("alpha " * 50)
+    await engine.on_files_changed([("a.md", "A")])
+    engine._reranker = StubReranker()
+
+    batch_sizes = []
+    search_batch = engine._faiss.search_batch
+
+    def counting_search_batch(vectors, top_k):
+        batch_sizes.append(len(vectors))
+        return search_batch(vectors, top_k)
+
+    engine._faiss.search_batch = counting_search_batch
+    results = await asyncio.gather(*(engine.search(q) for q in ("a", "b", "c")))
+    await engine.close()
+
+    assert batch_sizes == [3]
+    assert all(r and r[0]["file_name"] == "a.md" for r in results)
+
+
+def test_rerank_candidates_skips_clear_winners():
+    from src.semantic.engine import _rerank_candidates
+
+    clear = [{"score": s} for s in (0.9, 0.85, 0.8, 0.5, 0.4)]
+    assert _rerank_candidates(clear, top_k=2) == (clear[:2], False)
+
+    close = [{"score": s} for s in (0.55, 0.52, 0.5, 0.3, 0.2)]
+    assert _rerank_candidates(close, top_k=2) == (close[:3], True)
+
+
+@pytest.mark.asyncio
+async def test_search_falls_back_to_faiss_order_when_reranker_fails(engine):
+    repo = engine._repo_path
+    (repo / "a.md").write_text("alpha " * 50)
+    await engine.on_files_changed([("a.md", "A")])
+
+    class BrokenReranker:
+        async def rerank(self, query, candidates, top_k=10):
+            raise OSError("model unavailable")
+
+    engine._reranker = BrokenReranker()
+    results = await engine.search("alpha", top_k=5)
+    await engine.close()
+
+    assert [r["file_name"] for r in results] == ["a.md"]
+
+
+@pytest.mark.asyncio
+async def test_embed_query_reuses_recent_embedding():
+    from src.semantic.embedder import EMBEDDING_DIM, NomicEmbedder
+
+    embedder = NomicEmbedder()
+    embedder._model = object()  # skip the model load
+    calls = []
+
+    def fake_encode(texts, **kwargs):
+        calls.append(texts)
+        return np.ones((len(texts), EMBEDDING_DIM), dtype=np.float32)
+
+    embedder._encode = fake_encode
+    first = await embedder.embed_query("Alpha beta")
+    second = await embedder.embed_query("  alpha BETA ")
+
+    assert len(calls) == 1
+    np.testing.assert_array_equal(first, second)